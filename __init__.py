@@ -3,12 +3,13 @@
 # ============================================================
 
 from .nav_button import NavButton
-from .long_press_row import LongPressRow
+from .long_press_row import LongPressRow, LongPressList
 from .common import show_popup, show_animated_popup
 
 __all__ = [
     'NavButton',
     'LongPressRow',
+    'LongPressList',
     'show_popup',
     'show_animated_popup'
 ]
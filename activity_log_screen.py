@@ -15,11 +15,16 @@ from datetime import datetime
 
 import utils.database as db
 import utils.utils as utils
+import utils.instrumentation as instrumentation
+from utils.data_repository import repository
 from widgets.common import show_popup, show_animated_popup
-from widgets.long_press_row import LongPressRow
+from widgets.long_press_row import LongPressRow, LongPressList
 
 
 class ActivityLogScreen(Screen):
+    # Rows built per step when the list is built in steps (see display_items_in_steps)
+    ROWS_PER_STEP = 25
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.all_items = []
@@ -28,6 +33,17 @@ class ActivityLogScreen(Screen):
         self.current_sort = "Date (Newest)"
         self.show_mode = "All"
         self._items_loaded = False
+        self._build_id = 0
+        repository.bind(on_change=self._on_data_change)
+    
+    def _on_data_change(self, repo, change):
+        """Reload from the repository now if visible, otherwise on the next visit"""
+        if change.kind == 'category':
+            return
+        if self.manager and self.manager.current == self.name:
+            self.refresh_items()
+        else:
+            self._items_loaded = False
     
     def on_enter(self):
         """Load items only if not already loaded"""
@@ -35,24 +51,32 @@ class ActivityLogScreen(Screen):
             self.refresh_items()
             self._items_loaded = True
     
+    @staticmethod
+    def load_items(username):
+        """Fetch expenses and incomes (no widget access, safe off the UI thread)"""
+        if repository.holds(username):
+            exps, incs = repository.expenses(), repository.incomes()
+        else:
+            exps, incs = db.get_user_expenses(username), db.get_user_incomes(username)
+        # Copies, so the 'type' tag stays out of the shared session data
+        return ([dict(e, type='expense') for e in exps] +
+                [dict(i, type='income') for i in incs])
+    
+    def set_items(self, items):
+        """Display items fetched by load_items"""
+        for _ in self.set_items_in_steps(items):
+            pass
+    
+    def set_items_in_steps(self, items):
+        """Generator form of set_items; yields between chunks of rows"""
+        self.all_items = items
+        self.filtered_items = self._filtered_items()
+        yield from self.display_items_in_steps(self.filtered_items)
+        self._items_loaded = True
+    
     def refresh_items(self):
         """Load and display expenses and incomes"""
-        un = App.get_running_app().logged_user
-        
-        # Get expenses
-        exps = db.get_user_expenses(un)
-        for e in exps:
-            e['type'] = 'expense'
-        
-        # Get incomes
-        incs = db.get_user_incomes(un)
-        for i in incs:
-            i['type'] = 'income'
-        
-        # Combine
-        self.all_items = exps + incs
-        self.apply_filters()
-        self._items_loaded = True
+        self.set_items(self.load_items(App.get_running_app().logged_user))
     
     def toggle_show_mode(self):
         """Cycle through show modes: All -> Expenses -> Incomes -> All"""
@@ -88,6 +112,11 @@ class ActivityLogScreen(Screen):
     
     def apply_filters(self):
         """Apply search, filter, and sort"""
+        self.filtered_items = self._filtered_items()
+        self.display_items(self.filtered_items)
+    
+    def _filtered_items(self):
+        """all_items after the type filter, search and sort"""
         items = self.all_items[:]
         
         # Filter by type
@@ -119,8 +148,7 @@ class ActivityLogScreen(Screen):
         elif self.current_sort == "Category (A-Z)":
             items = sorted(items, key=lambda x: x.get('category', '').lower())
         
-        self.filtered_items = items
-        self.display_items(items)
+        return items
     
     def _get_date_grouping_info(self, items):
         """
@@ -164,11 +192,22 @@ class ActivityLogScreen(Screen):
         
         return grouping
     
+    @instrumentation.timed("activity.display_items")
     def display_items(self, items):
         """Display expenses and incomes in list with date grouping"""
+        for _ in self.display_items_in_steps(items):
+            pass
+    
+    def display_items_in_steps(self, items):
+        """
+        Generator form of display_items: yields after every ROWS_PER_STEP rows.
+        A newer build of the list ends an older one that is still in progress.
+        """
         if not hasattr(self.ids, 'expense_list'):
             return
         
+        self._build_id += 1
+        build_id = self._build_id
         self.ids.expense_list.clear_widgets()
         
         if not items:
@@ -210,16 +249,15 @@ class ActivityLogScreen(Screen):
                     # Single item: round all corners
                     radius = [dp(8)]
                 
-                # Create row with long press support
+                # Create row; the list detects long presses for all rows
                 row = LongPressRow(
                     orientation="horizontal",
                     size_hint_y=None,
                     height=dp(40),
                     padding=(dp(8), dp(4)),
-                    spacing=dp(8)
+                    spacing=dp(8),
+                    item_data=itm
                 )
-                row.item_data = itm
-                row.bind(on_long_press=self.show_edit_delete_menu)
                 
                 # Background color based on type
                 bgc = (0.06, 0.06, 0.06, 1) if itm['type'] == 'expense' else (0.06, 0.12, 0.08, 1)
@@ -278,7 +316,7 @@ class ActivityLogScreen(Screen):
                     row.add_widget(cb)
                     
                     # Show income source
-                    inn = "General" if not itm.get('income_id') else db.get_income_name(itm['income_id'])
+                    inn = "General" if not itm.get('income_id') else repository.income_name(itm['income_id'])
                     row.add_widget(Label(
                         text=f"from: {inn}",
                         size_hint_x=0.20,
@@ -331,6 +369,11 @@ class ActivityLogScreen(Screen):
                 if group_info['is_grouped'] and group_info['is_last'] and idx < len(items) - 1:
                     spacer = Widget(size_hint_y=None, height=dp(4))
                     self.ids.expense_list.add_widget(spacer)
+                
+                if (idx + 1) % self.ROWS_PER_STEP == 0 and idx < len(items) - 1:
+                    yield
+                    if build_id != self._build_id:
+                        return
             
             # Update total label
             if hasattr(self.ids, 'total_label'):
@@ -342,9 +385,8 @@ class ActivityLogScreen(Screen):
                 else:
                     self.ids.total_label.text = f"Income: {utils.format_amount(ti)} | Expenses: {utils.format_amount(te)}{ct}"
     
-    def show_edit_delete_menu(self, row_widget):
+    def show_edit_delete_menu(self, itm):
         """Show edit/delete menu when row is long-pressed"""
-        itm = row_widget.item_data
         content = BoxLayout(orientation="vertical", spacing=dp(10), padding=dp(15))
         
         typ = "Income" if itm['type'] == 'income' else "Expense"
@@ -445,7 +487,7 @@ class ActivityLogScreen(Screen):
         ni = TextInput(text=exp['name'], multiline=False, size_hint_y=None, height=dp(40))
         content.add_widget(ni)
         
-        cats = db.get_categories(App.get_running_app().logged_user)
+        cats = repository.categories()
         content.add_widget(Label(
             text="Category:",
             size_hint_y=None,
@@ -488,14 +530,14 @@ class ActivityLogScreen(Screen):
         content.add_widget(ai)
         
         # Income spinner
-        incs = db.get_user_incomes(App.get_running_app().logged_user)
+        incs = repository.incomes()
         iv = ["General (No specific income)"]
         for inc in incs:
             iv.append(f"{inc['name']} (ID: {inc['id']})")
         
         cit = "General (No specific income)"
         if exp.get('income_id'):
-            cit = f"{db.get_income_name(exp['income_id'])} (ID: {exp['income_id']})"
+            cit = f"{repository.income_name(exp['income_id'])} (ID: {exp['income_id']})"
         
         content.add_widget(Label(
             text="Income Source:",
@@ -529,9 +571,8 @@ class ActivityLogScreen(Screen):
                 if not nn or not nc or not nd or na <= 0:
                     return show_popup("Error", "Please fill all fields correctly", size_hint=(0.6, 0.35))
                 datetime.strptime(nd, "%Y-%m-%d")
-                db.update_expense(exp['id'], nn, nc, nd, na, nii)
+                repository.update_expense(exp['id'], nn, nc, nd, na, nii)
                 popup.dismiss()
-                self.refresh_items()
                 App.get_running_app().refresh_all_screens()
                 show_popup("Success", "Expense updated!", size_hint=(0.6, 0.35))
             except Exception as e:
@@ -605,9 +646,8 @@ class ActivityLogScreen(Screen):
                 if not nn or not nd or na <= 0:
                     return show_popup("Error", "Please fill all fields correctly", size_hint=(0.6, 0.35))
                 datetime.strptime(nd, "%Y-%m-%d")
-                db.update_income(inc['id'], nn, na, nd)
+                repository.update_income(inc['id'], nn, na, nd)
                 popup.dismiss()
-                self.refresh_items()
                 App.get_running_app().refresh_all_screens()
                 show_popup("Success", "Income updated!", size_hint=(0.6, 0.35))
             except Exception as e:
@@ -641,9 +681,8 @@ class ActivityLogScreen(Screen):
         popup = Popup(title="Confirm Delete", content=content, size_hint=(0.8, None), height=dp(220))
         
         def do_delete(inst):
-            db.delete_expense(exp["id"])
+            repository.delete_expense(exp["id"])
             popup.dismiss()
-            self.refresh_items()
             App.get_running_app().refresh_all_screens()
         
         nb.bind(on_release=lambda x: popup.dismiss())
@@ -674,9 +713,8 @@ class ActivityLogScreen(Screen):
         popup = Popup(title="Confirm Delete", content=content, size_hint=(0.8, None), height=dp(240))
         
         def do_delete(inst):
-            db.delete_income(inc["id"])
+            repository.delete_income(inc["id"])
             popup.dismiss()
-            self.refresh_items()
             App.get_running_app().refresh_all_screens()
         
         nb.bind(on_release=lambda x: popup.dismiss())
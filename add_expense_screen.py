@@ -12,30 +12,46 @@ from kivy.clock import Clock
 from kivy.app import App
 from datetime import datetime
 
-import utils.database as db
 import utils.utils as utils
+from utils.data_repository import repository
 from widgets.common import show_popup, show_animated_popup
 
 
+GENERAL_INCOME = "General (No specific income)"
+
+
 class AddExpenseScreen(Screen):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.is_expense_mode = True  # True = Expense, False = Income
+        self._income_choices = {}    # spinner text -> income id
+        self._incomes_dirty = True
+        repository.bind(on_change=self._on_data_change, on_session=self._on_session)
+    
+    def _on_data_change(self, repo, change):
+        """Income balances move with incomes and with linked expenses"""
+        if change.kind in ('income', 'expense'):
+            self._incomes_dirty = True
+    
+    def _on_session(self, repo, username):
+        """The spinner still lists the previous user's incomes"""
+        self._incomes_dirty = True
     
     def on_enter(self):
         """Initialize screen when entering"""
-        un = App.get_running_app().logged_user
-        
         # Setup category spinner
         if hasattr(self.ids, 'category_spinner'):
-            cats = db.get_categories(un)
+            cats = repository.categories()
             self.ids.category_spinner.values = cats
             if cats:
                 self.ids.category_spinner.text = cats[0]
         
-        # Setup income spinner
+        # Setup income spinner (choices are rebuilt only after income changes)
         if hasattr(self.ids, 'income_spinner'):
-            self.refresh_income_spinner()
+            if self._incomes_dirty:
+                self.refresh_income_spinner()
+            else:
+                self.ids.income_spinner.text = GENERAL_INCOME
         
         # Set default date
         if hasattr(self.ids, 'date_input'):
@@ -139,21 +155,33 @@ class AddExpenseScreen(Screen):
         
         Clock.schedule_once(reset_scroll_and_input, 0.15)
     
-    def refresh_income_spinner(self):
-        """Refresh the income spinner with current incomes"""
+    def refresh_income_spinner(self, incomes=None):
+        """Refresh the income spinner with current (or already fetched) incomes"""
         if not hasattr(self.ids, 'income_spinner'):
             return
         
-        un = App.get_running_app().logged_user
-        incs = db.get_user_incomes(un)
+        if incomes is None:
+            incomes = repository.incomes()
         
-        iv = ["General (No specific income)"]
-        for inc in incs:
+        choices = {}
+        for inc in incomes:
             if inc['remaining'] > 0:
-                iv.append(f"{inc['name']} (₱{inc['remaining']:.2f} left)")
+                text = f"{inc['name']} (₱{inc['remaining']:.2f} left)"
+                if text in choices:
+                    # Same name and balance: the id keeps the choices apart
+                    text = f"{inc['name']} #{inc['id']} (₱{inc['remaining']:.2f} left)"
+                choices[text] = inc['id']
         
-        self.ids.income_spinner.values = iv
-        self.ids.income_spinner.text = iv[0]
+        self._income_choices = choices
+        self._incomes_dirty = False
+        self.ids.income_spinner.values = [GENERAL_INCOME] + list(choices)
+        self.ids.income_spinner.text = GENERAL_INCOME
+    
+    def selected_income_id(self):
+        """Id of the income picked in the spinner, or None for General"""
+        if not hasattr(self.ids, 'income_spinner'):
+            return None
+        return self._income_choices.get(self.ids.income_spinner.text)
     
     def save_entry(self):
         """Save expense or income"""
@@ -165,7 +193,6 @@ class AddExpenseScreen(Screen):
     def save_expense(self):
         """Save expense with income tracking"""
         app = App.get_running_app()
-        un = app.logged_user
         
         nm = self.ids.name_input.text.strip() or "Expense"
         cat = self.ids.category_spinner.text
@@ -190,26 +217,18 @@ class AddExpenseScreen(Screen):
             return show_popup("Error", str(e))
         
         # Get selected income
-        inc_id = None
-        if hasattr(self.ids, 'income_spinner'):
-            it = self.ids.income_spinner.text
-            if not it.startswith("General"):
-                inn = it.split(" (")[0]
-                incs = db.get_user_incomes(un)
-                for inc in incs:
-                    if inc['name'] == inn:
-                        inc_id = inc['id']
-                        if inc['remaining'] < amt:
-                            return show_popup(
-                                "Warning",
-                                f"Not enough remaining in {inn}!\n"
-                                f"Remaining: {utils.format_amount(inc['remaining'])}\n"
-                                f"Expense: {utils.format_amount(amt)}"
-                            )
-                        break
+        inc = repository.income(self.selected_income_id())
+        inc_id = inc['id'] if inc else None
+        if inc and inc['remaining'] < amt:
+            return show_popup(
+                "Warning",
+                f"Not enough remaining in {inc['name']}!\n"
+                f"Remaining: {utils.format_amount(inc['remaining'])}\n"
+                f"Expense: {utils.format_amount(amt)}"
+            )
         
         # Save expense
-        db.add_expense(un, nm, cat, dt, amt, inc_id)
+        repository.add_expense(nm, cat, dt, amt, inc_id)
         show_popup("Success", "Expense saved!")
         
         # Refresh all screens
@@ -224,7 +243,6 @@ class AddExpenseScreen(Screen):
     def save_income(self):
         """Save income"""
         app = App.get_running_app()
-        un = app.logged_user
         
         nm = self.ids.name_input.text.strip()
         dt = self.ids.date_input.text.strip()
@@ -251,7 +269,7 @@ class AddExpenseScreen(Screen):
             return show_popup("Error", str(e))
         
         # Save income
-        db.add_income(un, nm, amt, dt)
+        repository.add_income(nm, amt, dt)
         show_popup("Success", "Income added!")
         
         # Refresh all screens
@@ -264,8 +282,6 @@ class AddExpenseScreen(Screen):
     
     def add_new_category(self):
         """Add new category"""
-        un = App.get_running_app().logged_user
-        
         content = BoxLayout(orientation="vertical", spacing=dp(10), padding=dp(12))
         ci = TextInput(hint_text="Category name", multiline=False)
         br = BoxLayout(size_hint_y=None, height=dp(40), spacing=dp(8))
@@ -280,8 +296,8 @@ class AddExpenseScreen(Screen):
         def do_submit(inst):
             cn = ci.text.strip().title()
             if cn:
-                if db.add_category(un, cn):
-                    cats = db.get_categories(un)
+                if repository.add_category(cn):
+                    cats = repository.categories()
                     self.ids.category_spinner.values = cats
                     self.ids.category_spinner.text = cn
                     popup.dismiss()
@@ -6,6 +6,7 @@ Stores user session securely
 
 import json
 import os
+import time
 import hashlib
 import secrets
 from datetime import datetime, timedelta
@@ -16,6 +17,13 @@ class AuthManager:
     
     SESSION_FILE = "user_session.json"
     SESSION_DURATION_DAYS = 30  # Auto-logout after 30 days
+    FLUSH_INTERVAL = 60         # Seconds between last_activity writes
+    
+    # Process-wide session state; the file is read at most once per run
+    _session = None
+    _loaded = False
+    _dirty = False
+    _last_flush = 0.0
     
     @staticmethod
     def _encrypt_data(data: str, salt: str = None) -> tuple:
@@ -59,63 +67,105 @@ class AuthManager:
             "last_activity": datetime.now().isoformat()
         }
         
+        AuthManager._session = session_data
+        AuthManager._loaded = True
+        if not AuthManager._write(session_data):
+            return False
+        print(f"✓ Session saved for user: {username}")
+        return True
+    
+    @staticmethod
+    def _write(session_data: dict) -> bool:
+        """Atomically replace the session file (temp file + os.replace)"""
+        tmp = AuthManager.SESSION_FILE + ".tmp"
         try:
-            with open(AuthManager.SESSION_FILE, 'w') as f:
-                json.dump(session_data, f, indent=2)
+            with open(tmp, 'w') as f:
+                json.dump(session_data, f, separators=(',', ':'))
             
             # Set file permissions to read/write for owner only (Unix-like systems)
             try:
-                os.chmod(AuthManager.SESSION_FILE, 0o600)
-            except:
+                os.chmod(tmp, 0o600)
+            except OSError:
                 pass  # Windows doesn't support chmod
             
-            print(f"✓ Session saved for user: {username}")
+            os.replace(tmp, AuthManager.SESSION_FILE)
+            AuthManager._dirty = False
+            AuthManager._last_flush = time.monotonic()
             return True
             
         except Exception as e:
             print(f"✗ Failed to save session: {e}")
             return False
     
+    @staticmethod
+    def _read_session() -> dict:
+        """Read the session file once per process"""
+        if AuthManager._loaded:
+            return AuthManager._session
+        AuthManager._loaded = True
+        AuthManager._last_flush = time.monotonic()
+        
+        if not os.path.exists(AuthManager.SESSION_FILE):
+            print("No session file found")
+            return None
+        
+        try:
+            with open(AuthManager.SESSION_FILE, 'r') as f:
+                AuthManager._session = json.load(f)
+            print(f"✓ Session loaded for user: {AuthManager._session.get('username')}")
+        except Exception as e:
+            print(f"✗ Failed to load session: {e}")
+            AuthManager.clear_session()
+        return AuthManager._session
+    
     @staticmethod
     def load_session() -> dict:
         """
-        Load user session from file
+        Get the current session, reading the file only on first use
         
         Returns:
             dict with session data or None if no valid session
         """
-        if not os.path.exists(AuthManager.SESSION_FILE):
-            print("No session file found")
+        session_data = AuthManager._read_session()
+        if session_data is None:
             return None
         
         try:
-            with open(AuthManager.SESSION_FILE, 'r') as f:
-                session_data = json.load(f)
-            
             # Check if session has expired
             expires_at = datetime.fromisoformat(session_data.get('expires_at', ''))
-            
-            if datetime.now() > expires_at:
-                print("Session expired")
-                AuthManager.clear_session()
-                return None
-            
-            # Update last activity
-            session_data['last_activity'] = datetime.now().isoformat()
-            with open(AuthManager.SESSION_FILE, 'w') as f:
-                json.dump(session_data, f, indent=2)
-            
-            print(f"✓ Session loaded for user: {session_data.get('username')}")
-            return session_data
-            
-        except Exception as e:
+        except (TypeError, ValueError) as e:
             print(f"✗ Failed to load session: {e}")
             AuthManager.clear_session()
             return None
+        
+        if datetime.now() > expires_at:
+            print("Session expired")
+            AuthManager.clear_session()
+            return None
+        
+        AuthManager._touch()
+        return session_data
+    
+    @staticmethod
+    def _touch():
+        """Record activity in memory; written out at most every FLUSH_INTERVAL"""
+        AuthManager._session['last_activity'] = datetime.now().isoformat()
+        AuthManager._dirty = True
+        if time.monotonic() - AuthManager._last_flush >= AuthManager.FLUSH_INTERVAL:
+            AuthManager.flush()
+    
+    @staticmethod
+    def flush():
+        """Write pending session changes (call on pause/stop)"""
+        if AuthManager._dirty and AuthManager._session is not None:
+            AuthManager._write(AuthManager._session)
     
     @staticmethod
     def clear_session():
         """Clear the saved session (logout)"""
+        AuthManager._session = None
+        AuthManager._loaded = True
+        AuthManager._dirty = False
         try:
             if os.path.exists(AuthManager.SESSION_FILE):
                 os.remove(AuthManager.SESSION_FILE)
@@ -141,14 +191,6 @@ class AuthManager:
     
     @staticmethod
     def update_session_activity():
-        """Update the last activity timestamp"""
-        session = AuthManager.load_session()
-        if session:
-            session['last_activity'] = datetime.now().isoformat()
-            try:
-                with open(AuthManager.SESSION_FILE, 'w') as f:
-                    json.dump(session, f, indent=2)
-            except:
-                pass
-
-
+        """Update the last activity timestamp and write it out now"""
+        if AuthManager.load_session():
+            AuthManager.flush()
@@ -1,46 +1,52 @@
-from datetime import datetime
+from datetime import datetime, date
+from functools import lru_cache
+import bisect
 import calendar
-import os
-import logging
+
+import utils.utils as utils
 
 # ============================================================
-# Optional matplotlib support
+# Optional NumPy support (imported lazily)
 # ============================================================
 
-try:
-    import matplotlib
-    matplotlib.use("Agg")
-
-    from matplotlib.figure import Figure
-    import matplotlib.pyplot as plt
-    from matplotlib.patches import Circle
-    import numpy as np
+_np = None
 
-    logging.getLogger("matplotlib").setLevel(logging.WARNING)
-    MATPLOTLIB_AVAILABLE = True
-except Exception:
-    MATPLOTLIB_AVAILABLE = False
+def load_numpy():
+    """Import NumPy on first use; returns the module, or None if it is not installed"""
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np or None
 
 
 # ============================================================
 # Date helpers
 # ============================================================
 
+def expense_date_fields(exp):
+    """Return (ordinal, year, month, day) for an expense, preferring the precomputed fields"""
+    fields = exp.get("date_fields")
+    if fields is None:
+        fields = utils.parse_date_fields(exp.get("date", ""))
+    return fields
+
 def parse_date(date_str):
-    try:
-        return datetime.strptime(date_str[:10], "%Y-%m-%d")
-    except Exception:
+    fields = utils.parse_date_fields(date_str)
+    if not fields:
         return None
+    return datetime(fields[1], fields[2], fields[3])
 
-# ... [Keep your existing aggregation functions here: aggregate_by_month, etc] ...
-# (They are unchanged, omitting for brevity)
 def aggregate_by_month(expenses, year):
     monthly_totals = [0] * 12
     per_month_expenses = [[] for _ in range(12)]
     for exp in expenses:
-        dt = parse_date(exp.get("date", ""))
-        if dt and dt.year == year:
-            idx = dt.month - 1
+        fields = expense_date_fields(exp)
+        if fields and fields[1] == year:
+            idx = fields[2] - 1
             monthly_totals[idx] += exp.get("amount", 0)
             per_month_expenses[idx].append(exp)
     return monthly_totals, per_month_expenses
@@ -50,24 +56,153 @@ def aggregate_by_day(expenses, year, month):
     daily_totals = [0] * days
     per_day_expenses = [[] for _ in range(days)]
     for exp in expenses:
-        dt = parse_date(exp.get("date", ""))
-        if dt and dt.year == year and dt.month == month:
-            idx = dt.day - 1
+        fields = expense_date_fields(exp)
+        if fields and fields[1] == year and fields[2] == month:
+            idx = fields[3] - 1
             daily_totals[idx] += exp.get("amount", 0)
             per_day_expenses[idx].append(exp)
     return daily_totals, per_day_expenses
 
-def aggregate_by_week(expenses, year, month):
-    week_totals = [0] * 5
-    per_week_expenses = [[] for _ in range(5)]
+@lru_cache(maxsize=64)
+def iso_weeks_in_year(year):
+    # 28 December always falls in the last ISO week of its year
+    return date(year, 12, 28).isocalendar()[1]
+
+@lru_cache(maxsize=64)
+def _iso_year_start(year):
+    """Ordinal of the Monday that starts ISO week 1 of year"""
+    jan4 = date(year, 1, 4)
+    return jan4.toordinal() - jan4.weekday()
+
+def iso_year_bounds(year):
+    """(first Monday, last Sunday) of an ISO week-numbering year"""
+    start = _iso_year_start(year)
+    return date.fromordinal(start), date.fromordinal(start + iso_weeks_in_year(year) * 7 - 1)
+
+def aggregate_by_week(expenses, year):
+    weeks = iso_weeks_in_year(year)
+    week_totals = [0] * weeks
+    per_week_expenses = [[] for _ in range(weeks)]
     for exp in expenses:
-        dt = parse_date(exp.get("date", ""))
-        if dt and dt.year == year and dt.month == month:
-            idx = min((dt.day - 1) // 7, 4)
+        idx = bucket_of(expense_date_fields(exp), "Weekly", year)
+        if idx is not None:
             week_totals[idx] += exp.get("amount", 0)
             per_week_expenses[idx].append(exp)
     return week_totals, per_week_expenses
 
+def bucket_of(fields, mode, year, month=None):
+    """Bar index for parsed date fields in the given view mode, or None if outside the view"""
+    if not fields:
+        return None
+    if mode == "Weekly":
+        # Whole weeks since the year's first ISO Monday; no per-expense date object
+        idx = (fields[0] - _iso_year_start(year)) // 7
+        return idx if 0 <= idx < iso_weeks_in_year(year) else None
+    if fields[1] != year:
+        return None
+    if mode == "Monthly":
+        return fields[2] - 1
+    if mode == "Daily" and fields[2] == month:
+        return fields[3] - 1
+    return None
+
+def build_bucket_index(expenses, mode, year, month=None):
+    """Map each bar index to the positions of its expenses, parsing every date once"""
+    index = {}
+    for pos, exp in enumerate(expenses):
+        idx = bucket_of(expense_date_fields(exp), mode, year, month)
+        if idx is not None:
+            index.setdefault(idx, []).append(pos)
+    return index
+
+class TimeSeriesPyramid:
+    """
+    Expense totals for a whole history, precomputed at day, week and month
+    resolution. Each level keeps parallel lists sorted by bucket start
+    (a date ordinal) so a viewport maps to a slice with two bisects.
+    """
+    LEVELS = ("day", "week", "month")
+    BUCKET_DAYS = {"day": 1, "week": 7, "month": 30.44}
+
+    def __init__(self, expenses):
+        buckets = {level: {} for level in self.LEVELS}
+        for pos, exp in enumerate(expenses):
+            fields = expense_date_fields(exp)
+            if not fields:
+                continue
+            ordinal, year, month, day = fields
+            amount = exp.get("amount", 0)
+            keys = (
+                ordinal,
+                ordinal - date.fromordinal(ordinal).weekday(),
+                ordinal - day + 1,
+            )
+            for level, key in zip(self.LEVELS, keys):
+                bucket = buckets[level].get(key)
+                if bucket is None:
+                    bucket = buckets[level][key] = [0, []]
+                bucket[0] += amount
+                bucket[1].append(pos)
+
+        self.starts = {}
+        self.ends = {}
+        self.totals = {}
+        self.members = {}
+        for level in self.LEVELS:
+            keys = sorted(buckets[level])
+            self.starts[level] = keys
+            self.ends[level] = [self._bucket_end(level, k) for k in keys]
+            self.totals[level] = [buckets[level][k][0] for k in keys]
+            self.members[level] = [buckets[level][k][1] for k in keys]
+
+        days = self.starts["day"]
+        self.first = days[0] if days else None
+        self.last = days[-1] + 1 if days else None
+        self._trends = {}
+        self._envelopes = {}
+
+    @staticmethod
+    def _bucket_end(level, start):
+        if level == "day":
+            return start + 1
+        if level == "week":
+            return start + 7
+        d = date.fromordinal(start)
+        return start + calendar.monthrange(d.year, d.month)[1]
+
+    def level_for(self, span_days, max_buckets):
+        """Finest level whose buckets over span_days fit in max_buckets"""
+        for level in self.LEVELS:
+            if span_days / self.BUCKET_DAYS[level] <= max_buckets:
+                return level
+        return self.LEVELS[-1]
+
+    def trend(self, n_out):
+        """
+        Daily totals of the whole history LTTB-reduced to n_out points, as
+        (xs, ys) lists. Computed once per n_out; callers bisect out the viewport.
+        """
+        series = self._trends.get(n_out)
+        if series is None:
+            series = self._trends[n_out] = _as_lists(lttb(*self._daily(), n_out))
+        return series
+
+    def envelope(self, n_buckets):
+        """Min/max band of the daily totals over n_buckets runs, as (xs, mins, maxs) lists, cached like trend()"""
+        band = self._envelopes.get(n_buckets)
+        if band is None:
+            band = self._envelopes[n_buckets] = _as_lists(minmax_envelope(*self._daily(), n_buckets))
+        return band
+
+    def _daily(self):
+        return dense_daily_totals(self.starts["day"], self.totals["day"], self.first, self.last)
+
+    def visible(self, level, start, end):
+        """(lo, hi) slice of buckets at level overlapping [start, end)"""
+        lo = bisect.bisect_right(self.ends[level], start)
+        hi = bisect.bisect_left(self.starts[level], end)
+        return lo, max(lo, hi)
+
 def aggregate_by_category(expenses):
     data = {}
     for exp in expenses:
@@ -77,191 +212,105 @@ def aggregate_by_category(expenses):
 
 
 # ============================================================
-# Chart utilities
+# Downsampling
 # ============================================================
 
-def create_bar_chart(labels, values, title="Bar Chart"):
-    # ... [Keep your existing bar chart code] ...
-    if not MATPLOTLIB_AVAILABLE:
-        return None
-    
-    fig = Figure(figsize=(10, 4.5), dpi=100, facecolor="#0b0b0b")
-    ax = fig.add_subplot(111, facecolor="#1a1a1a")
-    
-    colors = ["#0FA3B1", "#0FC4C9", "#1ECFE5", "#2DB8D6", "#3CA1C7"]
-    bar_colors = [colors[i % len(colors)] for i in range(len(values))]
-    
-    bars = ax.bar(range(len(values)), values, color=bar_colors, width=0.65, edgecolor="#0FA3B1", linewidth=1.5)
-    
-    for bar, val in zip(bars, values):
-        if val > 0:
-            ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height(), f"₱{val:,.0f}", ha="center", va="bottom", fontsize=9, color="white", fontweight="bold")
-            
-    ax.set_xticks(range(len(labels)))
-    ax.set_xticklabels(labels, rotation=45, ha="right", fontsize=10, color="#B0B0B0")
-    ax.set_ylabel("Amount (₱)", fontsize=9, color="#B0B0B0", fontweight="bold")
-    ax.set_title(title, fontsize=13, fontweight="bold", color="white", pad=15)
-    ax.grid(axis="y", alpha=0.2, color="#333333", linestyle="--", linewidth=0.8)
-    ax.set_axisbelow(True)
-    ax.tick_params(colors="#B0B0B0", labelsize=9)
-    for spine in ax.spines.values():
-        spine.set_edgecolor="#333333"
-        spine.set_linewidth(1)
-        
-    fig.tight_layout()
-    return fig
-
-def create_pie_chart_donut(data, title=None, explode=None):
-    if not MATPLOTLIB_AVAILABLE or not data:
-        return None, None
-
-    labels = list(data.keys())
-    values = list(data.values())
-    total = sum(values)
-
-    colors = [
-        "#0FA3B1", "#1ECFE5", "#3FA9D6", "#5B8BC4", "#7B68BE",
-        "#9B4FB3", "#BB4FA3", "#DB5F9D", "#E77F87", "#F39C12"
-    ]
-
-    if len(labels) > len(colors):
-        colors *= (len(labels) // len(colors) + 1)
-
-    # Calculate figure height dynamically
-    # 0.4 inches per item ensures consistent spacing
-    fig_height = max(5, len(labels) * 0.4)
-    fig = Figure(figsize=(10, fig_height), dpi=100, facecolor="#0b0b0b")
-
-    gs = fig.add_gridspec(1, 2, width_ratios=[1, 1], wspace=0)
-    ax_donut = fig.add_subplot(gs[0, 0], facecolor="#0b0b0b")
-    ax_legend = fig.add_subplot(gs[0, 1], facecolor="#0b0b0b")
-
-    wedges, texts = ax_donut.pie(
-        values,
-        startangle=90,
-        colors=colors[:len(labels)],
-        explode=explode if explode else [0] * len(labels),
-        wedgeprops=dict(width=0.45, edgecolor="#1a1a1a", linewidth=2.5),
-        counterclock=False
-    )
-
-    for t in texts:
-        t.set_text("")
-
-    if title:
-        ax_donut.text(
-            0.5, 0.95, title,
-            ha="center", va="top",
-            fontsize=14, fontweight="bold", color="white",
-            transform=ax_donut.transAxes
-        )
-
-    ax_legend.axis("off")
-
-    legend_labels = []
-    for i, (label, value) in enumerate(zip(labels, values)):
-        pct = (value / total * 100) if total > 0 else 0
-        short = label[:18] + ".." if len(label) > 18 else label
-        prefix = "▶ " if explode and explode[i] > 0 else ""
-        legend_labels.append(f"{prefix}{short:<18} {pct:>5.1f}% (₱{value:,.0f})")
-
-    legend_elements = [
-        Circle((0, 0), radius=0.4, facecolor=colors[i], edgecolor="#1a1a1a", linewidth=1)
-        for i in range(len(labels))
-    ]
-
-    # Create Legend
-    legend = ax_legend.legend(
-        legend_elements,
-        legend_labels,
-        loc="center left", # This centers the block vertically
-        frameon=False,
-        fontsize=11,
-        handlelength=1.5,
-        labelspacing=1.0 
-    )
-
-    for i, text in enumerate(legend.get_texts()):
-        text.set_family("monospace")
-        if explode and explode[i] > 0:
-            text.set_color(colors[i])
-            text.set_fontweight("bold")
+def lttb(x, y, n_out):
+    """
+    Largest-triangle-three-buckets: pick n_out of the (x, y) points that keep
+    the visual shape of the series, spikes included. Returns (xs, ys).
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return list(x), list(y)
+
+    every = (n - 2) / (n_out - 2)
+    # Per-bucket NumPy calls only pay off once buckets hold a few dozen points
+    np = load_numpy() if every >= 32 else None
+    if np is not None:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        picked = np.empty(n_out, dtype=int)
+    else:
+        x = x.tolist() if hasattr(x, "tolist") else list(x)
+        y = y.tolist() if hasattr(y, "tolist") else list(y)
+        picked = [0] * n_out
+    picked[0], picked[-1] = 0, n - 1
+
+    a = 0
+    for i in range(n_out - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        nhi = min(int((i + 2) * every) + 1, n)
+        if np is not None:
+            avg_x = x[hi:nhi].mean()
+            avg_y = y[hi:nhi].mean()
+            area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+            a = lo + int(area.argmax())
         else:
-            text.set_color("#B0B0B0")
-
-    # Important: Fill the figure completely to prevent savefig from resizing/cropping
-    fig.subplots_adjust(0, 0, 1, 1)
-    
-    # ---------------------------------------------------------
-    # CALCULATE METADATA MATHEMATICALLY
-    # ---------------------------------------------------------
-    # We allocated 0.4 inches of height per legend item in fig_height logic.
-    # We can use this to calculate the exact normalized coordinates.
-    
-    num_items = len(labels)
-    row_height_inch = 0.3
-    
-    # Normalized height of one row (0.0 to 1.0)
-    row_height_norm = row_height_inch / fig_height
-    
-    # Total height of the legend block
-    total_legend_height_norm = num_items * row_height_norm
-    
-    # Calculate Top Y (Center + Half Height)
-    legend_center_y = 0.5
-    legend_top_y = legend_center_y + (total_legend_height_norm / 2)
-    
-    items = []
-    
-    # The legend is in the RIGHT half (x=0.5 to x=1.0)
-    # But inside the metadata, we want coordinates relative to the whole figure 
-    # OR relative to the legend widget? The previous code used Figure coords.
-    # Figure coords for the legend area are roughly x=0.5 to x=1.0
-    
-    # However, for the bbox, we want the touchable area.
-    # Let's define the width as the full right half (0.5 width) or tighter.
-    # Let's make it user-friendly: slightly left of center to right edge.
-    legend_x0 = 0.55  
-    legend_width = 0.45
-
-    for i in range(num_items):
-        # Top of this item
-        item_top = legend_top_y - (i * row_height_norm)
-        # Bottom of this item
-        item_bottom = item_top - row_height_norm
-        
-        items.append({
-            "index": i,
-            "category": labels[i],
-            # bbox: x, y, w, h (Normalized 0-1)
-            "bbox": (legend_x0, item_bottom, legend_width, row_height_norm),
-            "center_y": item_bottom + (row_height_norm / 2)
-        })
-
-    metadata = {
-        "bbox": (0.5, 0.0, 0.5, 1.0), # Entire right half
-        "items": items,
-        "categories": labels,
-        "num_items": len(labels)
-    }
-
-    return fig, metadata
+            avg_x = sum(x[hi:nhi]) / (nhi - hi)
+            avg_y = sum(y[hi:nhi]) / (nhi - hi)
+            a = max(range(lo, hi), key=lambda j: abs(
+                (x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])))
+        picked[i + 1] = a
+
+    if np is not None:
+        return x[picked], y[picked]
+    return [x[j] for j in picked], [y[j] for j in picked]
+
+
+def minmax_envelope(x, y, n_buckets):
+    """
+    Split the series into n_buckets equal runs and return (xs, mins, maxs),
+    one entry per run, so every extreme survives the reduction.
+    """
+    n = len(x)
+    if n_buckets >= n or n_buckets < 1:
+        return list(x), list(y), list(y)
+
+    np = load_numpy()
+    if np is not None:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+        edges = (np.arange(n_buckets) * n // n_buckets).astype(int)
+        return x[edges], np.minimum.reduceat(y, edges), np.maximum.reduceat(y, edges)
+    edges = [i * n // n_buckets for i in range(n_buckets)] + [n]
+    runs = [y[edges[i]:edges[i + 1]] for i in range(n_buckets)]
+    return [x[e] for e in edges[:-1]], [min(r) for r in runs], [max(r) for r in runs]
+
+
+def _as_lists(arrays):
+    return tuple(a.tolist() if hasattr(a, "tolist") else a for a in arrays)
+
+
+def dense_daily_totals(ordinals, totals, start, end):
+    """Per-day totals for every day in [start, end), zero-filled, from sorted sparse day buckets"""
+    start, end = int(start), int(end)
+    lo = bisect.bisect_left(ordinals, start)
+    hi = bisect.bisect_left(ordinals, end)
+    np = load_numpy()
+    if np is not None:
+        days = np.zeros(max(end - start, 0))
+        days[np.asarray(ordinals[lo:hi], dtype=int) - start] = totals[lo:hi]
+        return np.arange(start, end, dtype=float), days
+    days = [0] * max(end - start, 0)
+    for o, t in zip(ordinals[lo:hi], totals[lo:hi]):
+        days[o - start] = t
+    return list(range(start, end)), days
 
 
 # ============================================================
-# Save helpers
+# Chart utilities
 # ============================================================
 
-def save_figure_to_image(fig, filename):
-    if not fig:
-        return None
-
-    path = os.path.abspath(filename)
-    
-    # CRITICAL FIX: Removed bbox_inches="tight"
-    # "tight" crops the image, invalidating our coordinate calculations.
-    # Since we set fig.subplots_adjust(0,0,1,1), the figure is already tight.
-    fig.savefig(path, dpi=100, facecolor="#0b0b0b")
-    
-    plt.close(fig)
-    return path
+DONUT_COLORS = [
+    "#0FA3B1", "#1ECFE5", "#3FA9D6", "#5B8BC4", "#7B68BE",
+    "#9B4FB3", "#BB4FA3", "#DB5F9D", "#E77F87", "#F39C12"
+]
+
+def format_legend_label(label, value, total, selected=False):
+    """Legend row text for the donut chart"""
+    pct = (value / total * 100) if total > 0 else 0
+    short = label[:18] + ".." if len(label) > 18 else label
+    prefix = "▶ " if selected else ""
+    return f"{prefix}{short:<18} {pct:>5.1f}% (₱{value:,.0f})"
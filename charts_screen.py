@@ -7,15 +7,15 @@ from kivy.metrics import dp, sp
 from kivy.clock import Clock
 from kivy.app import App
 from datetime import datetime
-import calendar
-import os
 import traceback
-import math
 
 import utils.database as db
 import utils.chart_utils as chart_utils
 import utils.utils as utils
-from widgets.interactive_charts import InteractiveBarChart
+import utils.period_cache as period_cache
+import utils.instrumentation as instrumentation
+from utils.data_repository import repository
+from widgets.interactive_charts import InteractiveBarChart, InteractiveDonutChart
 
 
 class ChartsScreen(Screen):
@@ -28,8 +28,16 @@ class ChartsScreen(Screen):
         self._last_scroll_y = 1.0
         self._scroll_event = None
         self._charts_generated = False
-        self.legend_metadata = None
-        self.debug_mode = True # Enable visual debugging
+        self.periods = period_cache.PeriodCache()
+        self._stale = False
+        repository.bind(on_change=self._on_data_change)
+    
+    def _on_data_change(self, repo, change):
+        """Drop only the periods the change touched; redraw on the next visit"""
+        if not change.periods:
+            return
+        self.periods.invalidate(change.periods)
+        self._stale = True
     
     def generate_charts(self):
         """Generate charts with debouncing"""
@@ -40,9 +48,11 @@ class ChartsScreen(Screen):
             0.1
         )
     
+    @instrumentation.timed("charts.generate")
     def _do_generate_charts(self):
         """Actually generate the charts"""
         un = App.get_running_app().logged_user
+        self._stale = False
         
         try:
             mode = getattr(self, 'current_view_mode', 'Daily')
@@ -61,18 +71,15 @@ class ChartsScreen(Screen):
                 except Exception:
                     mo = datetime.now().month
             
-            exps = db.filter_expenses_by_period(un, yr, mo if mode == "Daily" else None)
-            
-            if mode == "Monthly":
-                mt, _ = chart_utils.aggregate_by_month(exps, yr)
-                lbls = [calendar.month_abbr[i+1] for i in range(12)]
-                vals = mt
-            else:  # Daily mode
-                if not mo:
-                    mo = datetime.now().month
-                dt, _ = chart_utils.aggregate_by_day(exps, yr, mo)
-                lbls = [str(i+1) if (i+1) % 2 == 1 else "" for i in range(len(dt))]
-                vals = dt
+            if mode == "Timeline":
+                self._generate_timeline(un)
+                return
+
+            if mode == "Daily" and not mo:
+                mo = datetime.now().month
+
+            period = self.periods.get(un, mode, yr, mo)
+            exps, lbls, vals = period["expenses"], period["labels"], period["values"]
             
             if len(lbls) != len(vals):
                 if len(vals) < len(lbls):
@@ -89,19 +96,37 @@ class ChartsScreen(Screen):
             self.selected_category = None
             self.update_expense_table(exps)
             
-            cd = chart_utils.aggregate_by_category(exps)
+            cd = period["categories"]
             if cd:
                 self._generate_donut_chart(cd, title="Expenses by Category")
             else:
-                if hasattr(self.ids, 'pie_image'):
-                    self.ids.pie_image.source = ""
+                self._generate_donut_chart({})
+
+            # Warm the periods the user is likely to step to next
+            self.periods.prefetch(un, period_cache.adjacent_periods(mode, yr, mo))
                     
         except Exception as e:
             print("Error generating charts:", e)
             print(traceback.format_exc())
     
+    def _generate_timeline(self, username):
+        """Show the user's whole history in the zoomable timeline"""
+        exps = repository.expenses() if repository.holds(username) else db.get_all_expenses(username)
+        cw = self.ids.get('chart_widget')
+        if cw:
+            cw.set_timeline(exps)
+
+        self.current_expenses = exps
+        self.current_category_filter = None
+        self.selected_category = None
+        self.update_expense_table(exps)
+        self._generate_donut_chart(chart_utils.aggregate_by_category(exps), title="Expenses by Category")
+
     def on_enter(self):
         """Initialize charts screen"""
+        if self._charts_generated and self._stale:
+            # Expenses changed on another screen since the charts were drawn
+            self.generate_charts()
         if not self._charts_generated:
             if hasattr(self.ids, 'charts_scroll_view'):
                 self.ids.charts_scroll_view.scroll_y = 1.0
@@ -125,15 +150,17 @@ class ChartsScreen(Screen):
             if hasattr(self.ids, 'view_mode_button'):
                 self.ids.view_mode_button.text = f"View: {self.current_view_mode}"
             
-            # Set month spinner state based on initial mode
+            # Set spinner states based on initial mode
             if hasattr(self.ids, 'month_spinner'):
-                self.ids.month_spinner.disabled = (self.current_view_mode == "Monthly")
+                self.ids.month_spinner.disabled = (self.current_view_mode != "Daily")
+            if hasattr(self.ids, 'year_spinner'):
+                self.ids.year_spinner.disabled = (self.current_view_mode == "Timeline")
             
             if hasattr(self.ids, 'chart_widget'):
                 self.ids.chart_widget.bind(on_selection=self._on_bar_selection)
             
-            if hasattr(self.ids, 'pie_image'):
-                self.ids.pie_image.bind(on_touch_down=self._on_pie_touch)
+            if hasattr(self.ids, 'donut_chart'):
+                self.ids.donut_chart.bind(on_category_selection=self._on_donut_selection)
             
             self._update_sort_button()
             
@@ -168,13 +195,17 @@ class ChartsScreen(Screen):
             Animation(scroll_y=tgt, d=0.25, t='out_quad').start(self.ids.charts_scroll_view)
 
     def toggle_view_mode(self):
-        """Toggle between Monthly and Daily view"""
+        """Cycle between Daily, Weekly, Monthly and Timeline view"""
         if not hasattr(self, 'current_view_mode'):
             self.current_view_mode = "Daily"
 
-        # Cycle through modes: Daily -> Monthly -> Daily
+        # Cycle through modes: Daily -> Weekly -> Monthly -> Timeline -> Daily
         if self.current_view_mode == "Daily":
+            self.current_view_mode = "Weekly"
+        elif self.current_view_mode == "Weekly":
             self.current_view_mode = "Monthly"
+        elif self.current_view_mode == "Monthly":
+            self.current_view_mode = "Timeline"
         else:
             self.current_view_mode = "Daily"
 
@@ -185,7 +216,11 @@ class ChartsScreen(Screen):
         # Enable/disable month spinner based on mode
         if hasattr(self.ids, 'month_spinner'):
             self.ids.month_spinner.disabled = (
-                self.current_view_mode == "Monthly"
+                self.current_view_mode != "Daily"
+            )
+        if hasattr(self.ids, 'year_spinner'):
+            self.ids.year_spinner.disabled = (
+                self.current_view_mode == "Timeline"
             )
 
         self._scroll_to_top()
@@ -208,61 +243,22 @@ class ChartsScreen(Screen):
             print(f"Scroll error: {e}")
     
     def _generate_donut_chart(self, cat_data, title="Expenses by Category", explode_category=None):
-        """Generate donut chart and store legend metadata"""
+        """Show category totals in the donut chart (empty data clears it)"""
         try:
-            expl = None
-            if explode_category:
-                cats = list(cat_data.keys())
-                expl = [0.15 if c == explode_category else 0 for c in cats]
-            
-            cfig, legend_metadata = chart_utils.create_pie_chart_donut(cat_data, explode=expl)
-            
-            self.legend_metadata = legend_metadata
-            
-            if cfig:
-                pp = os.path.abspath("temp_pie.png")
-                chart_utils.save_figure_to_image(cfig, pp)
-                
-                def reload_image(dt):
-                    if hasattr(self.ids, 'pie_image'):
-                        self.ids.pie_image.source = ""
-                        Clock.schedule_once(lambda dt: self._set_pie_source(pp), 0.05)
-                
-                Clock.schedule_once(reload_image, 0.1)
+            dc = self.ids.get('donut_chart')
+            if dc:
+                dc.set_data(cat_data or {}, selected_category=explode_category)
         except Exception as e:
             print(f"Error generating donut chart: {e}")
             print(traceback.format_exc())
     
-    def _set_pie_source(self, path):
-        """Set pie image source"""
-        try:
-            if hasattr(self.ids, 'pie_image'):
-                self.ids.pie_image.source = path
-                self.ids.pie_image.reload()
-        except Exception as e:
-            print(f"Error setting pie source: {e}")
-    
-    def _draw_debug_overlay(self, instance, touch, display_width, display_height, offset_x, offset_y, legend_items):
-        """Draw visual debugging overlay on the image"""
-        if not self.debug_mode:
-            return
-        
-        # Clear previous debug drawings
-        if hasattr(instance, 'debug_canvas'):
-            instance.canvas.after.remove(instance.debug_canvas)
-        
-   
-    
     def _on_bar_selection(self, instance, index, filtered_expenses):
         """Handle bar chart selection"""
         try:
             if index is None:
                 self.selected_category = None
-                self.current_expenses = db.filter_expenses_by_period(
-                    App.get_running_app().logged_user,
-                    int(self.ids.year_spinner.text) if hasattr(self.ids, 'year_spinner') else datetime.now().year,
-                    None
-                )
+                # Back to everything the chart was built from; no need to re-query
+                self.current_expenses = list(instance.expenses or [])
                 self.update_expense_table(self.current_expenses)
                 cd = chart_utils.aggregate_by_category(self.current_expenses)
                 if cd:
@@ -276,8 +272,7 @@ class ChartsScreen(Screen):
             
             cd = chart_utils.aggregate_by_category(filtered_expenses or [])
             if not cd:
-                if hasattr(self.ids, 'pie_image'):
-                    self.ids.pie_image.source = ""
+                self._generate_donut_chart({})
                 return
             
             self._generate_donut_chart(cd, title="Selected Period Breakdown")
@@ -286,177 +281,17 @@ class ChartsScreen(Screen):
             print(f"Error in bar selection handler: {e}")
             print(traceback.format_exc())
 
-    def _on_pie_touch(self, instance, touch):
-        """Handle pie chart touch detection (both donut and legend)"""
-        if not instance.collide_point(*touch.pos):
-            return False
-        if hasattr(touch, 'button') and touch.button in ['scrollup', 'scrolldown']:
-            return False
-        
-        # Get image widget bounds
-        ix, iy, iw, ih = instance.pos[0], instance.pos[1], instance.size[0], instance.size[1]
-        
-        # Get the actual image dimensions from the texture
-        if not instance.texture:
-            return False
-        
-        img_width = instance.texture.width
-        img_height = instance.texture.height
-        
-        # Calculate how the image is scaled and positioned within the widget
-        widget_aspect = iw / ih if ih > 0 else 1
-        img_aspect = img_width / img_height if img_height > 0 else 1
-        
-        if widget_aspect > img_aspect:
-            # Widget is wider - image is letterboxed horizontally
-            display_height = ih
-            display_width = ih * img_aspect
-            offset_x = (iw - display_width) / 2
-            offset_y = 0
-        else:
-            # Widget is taller - image is letterboxed vertically
-            display_width = iw
-            display_height = iw / img_aspect
-            offset_x = 0
-            offset_y = (ih - display_height) / 2
-        
-        # Transform touch coordinates to image space
-        rel_x = touch.x - ix - offset_x
-        rel_y = touch.y - iy - offset_y
-        
-        # Check if touch is within displayed image bounds
-        if rel_x < 0 or rel_x > display_width or rel_y < 0 or rel_y > display_height:
-            return False
-        
-        # Convert to normalized coordinates (0-1 range in image space)
-        norm_x = rel_x / display_width
-        norm_y = rel_y / display_height
-        
-     
-        # Check if touch is in legend area (right half)
-        if norm_x >= 0.5:
-            legend_left = ix + offset_x + (display_width * 0.5)
-            legend_width = display_width * 0.5
-            legend_bottom = iy + offset_y
-            legend_height = display_height
-            
-            return self._handle_legend_touch(instance, touch,
-                                            legend_left, legend_bottom,
-                                            legend_width, legend_height,
-                                            display_width, display_height,
-                                            offset_x, offset_y)
-        
-        # Touch is in pie area (left half)
-        pie_display_left = ix + offset_x
-        pie_display_width = display_width * 0.5
-        pie_display_height = display_height
-        
-        title_padding_ratio = 0.05
-        pie_drawable_top = pie_display_height * (1 - title_padding_ratio)
-        pie_drawable_height = pie_drawable_top
-        
-        pie_diameter = min(pie_display_width, pie_drawable_height) * 0.95
-        
-        cx = pie_display_left + (pie_display_width / 2)
-        cy = iy + offset_y + (pie_drawable_height / 2)
-        
-        dx = touch.x - cx
-        dy = touch.y - cy
-        dist = math.sqrt(dx * dx + dy * dy)
-        
-        outer_radius = pie_diameter / 2
-        inner_radius = outer_radius * 0.55  
-        
-        if dist < inner_radius or dist > outer_radius:
-            if self.selected_category:
-                self.selected_category = None
-                cd = chart_utils.aggregate_by_category(self.current_expenses)
-                self._generate_donut_chart(cd, title="")
-                self.update_expense_table(self.current_expenses)
-            return False
-        
-        angle_rad = math.atan2(dy, dx)
-        angle_deg = (90 - math.degrees(angle_rad)) % 360
-        
-        cd = chart_utils.aggregate_by_category(self.current_expenses)
-        if not cd:
-            return False
-        
-        total = sum(cd.values())
-        cumulative_angle = 0
-        for category, amount in cd.items():
-            slice_angle = (amount / total) * 360
-            if cumulative_angle <= angle_deg < cumulative_angle + slice_angle:
-                self._toggle_category_selection(category)
-                break
-            cumulative_angle += slice_angle
-        
-        return True
-
-    def _handle_legend_touch(self, instance, touch, legend_x, legend_y, legend_width, legend_height,
-                            display_width, display_height, offset_x, offset_y):
-        """Handle touches in the legend area using actual matplotlib legend metadata"""
-        cd = chart_utils.aggregate_by_category(self.current_expenses)
-        if not cd:
-            return False
-        
-        if not hasattr(self, 'legend_metadata') or not self.legend_metadata:
-            print("Warning: No legend metadata available")
-            return False
-        
-        metadata = self.legend_metadata
-        legend_items = metadata.get('items', [])
-        
-        if not legend_items:
-            print("Warning: No legend items in metadata")
-            return False
-        
-        # Draw debug overlay
-        if self.debug_mode:
-            self._draw_debug_overlay(instance, touch, display_width, display_height, 
-                                    offset_x, offset_y, legend_items)
-        
-        # Get image widget bounds
-        ix, iy = instance.pos[0], instance.pos[1]
-        
-        # Transform touch coordinates to image space
-        rel_x = touch.x - ix - offset_x
-        rel_y = touch.y - iy - offset_y
-        
-        # Convert to figure coordinates (0-1 range)
-        fig_x = rel_x / display_width
-        fig_y = rel_y / display_height
-        
-        
-        # Check each legend item's bounding box
-        for item in legend_items:
-            bbox = item['bbox']
-            x0, y0, width, height = bbox
-            x1 = x0 + width
-            y1 = y0 + height
-            
-            # Add padding for easier clicking
-            padding = 0.02
-            x0 -= padding
-            y0 -= padding
-            x1 += padding
-            y1 += padding
-            
-         
-            if x0 <= fig_x <= x1 and y0 <= fig_y <= y1:
-                category = item['category']       
-                self._toggle_category_selection(category)
-                return True
-        
-        print("No legend item clicked")
-        if self.selected_category:
+    def _on_donut_selection(self, instance, category):
+        """Handle taps on donut wedges and legend rows"""
+        if category is not None:
+            self._toggle_category_selection(category)
+        elif self.selected_category:
             self.selected_category = None
+            self.current_category_filter = None
             cd = chart_utils.aggregate_by_category(self.current_expenses)
             self._generate_donut_chart(cd, title="")
             self.update_expense_table(self.current_expenses)
-        
-        return False
-        
+
     def _toggle_category_selection(self, category):
         """Toggle selection of a category"""
         from kivy.clock import Clock
@@ -0,0 +1,263 @@
+# utils/data_repository.py
+"""
+Per-session store of the logged-in user's expenses, incomes and categories
+The data is loaded once per login. Writes go through to SQLite and patch the
+cached collections in place, then an 'on_change' event tells subscribed
+screens what changed so they can update incrementally instead of re-querying.
+'on_session' fires when open()/close() switch the repository to another user.
+"""
+
+import threading
+
+from kivy.event import EventDispatcher
+
+import utils.database as db
+import utils.instrumentation as instrumentation
+
+
+class DataChange:
+    """What a write changed: kind is 'expense', 'income' or 'category',
+    action is 'added', 'updated' or 'deleted', periods is the set of
+    (year, month) pairs whose expenses were affected"""
+    __slots__ = ("kind", "action", "ids", "periods")
+
+    def __init__(self, kind, action, ids=(), periods=()):
+        self.kind = kind
+        self.action = action
+        self.ids = tuple(ids)
+        self.periods = frozenset(periods)
+
+    def __repr__(self):
+        return f"DataChange({self.kind} {self.action} {self.ids} {sorted(self.periods)})"
+
+
+def _period_of(expense):
+    fields = expense.get("date_fields")
+    return (fields[1], fields[2]) if fields else None
+
+
+class DataRepository(EventDispatcher):
+    """
+    Cached, indexed collections for one user session.
+
+    load() may run on a worker thread (the startup preload does that);
+    every other method belongs to the UI thread. Readers that run before
+    the load finished simply wait for it.
+    """
+
+    def __init__(self, **kwargs):
+        self.register_event_type('on_change')
+        self.register_event_type('on_session')
+        super().__init__(**kwargs)
+        self._lock = threading.RLock()
+        self.username = None
+        self._reset()
+
+    def _reset(self):
+        self._loaded = False
+        self._expenses = {}      # id -> expense dict
+        self._by_period = {}     # (year, month) -> set of expense ids
+        self._incomes = {}       # id -> income dict
+        self._categories = []
+
+    # ---------------- Session ----------------
+
+    def open(self, username):
+        """Switch to username's data; nothing is queried until first use"""
+        with self._lock:
+            if username == self.username:
+                return
+            self.username = username
+            self._reset()
+        self.dispatch('on_session', username)
+
+    def close(self):
+        """Forget the session's data (logout)"""
+        with self._lock:
+            if self.username is None:
+                return
+            self.username = None
+            self._reset()
+        self.dispatch('on_session', None)
+
+    def load(self):
+        """Query everything for the session once; later calls are no-ops"""
+        with self._lock:
+            if self._loaded or not self.username:
+                return self
+            with instrumentation.span("repository.load"):
+                for exp in db.get_user_expenses(self.username):
+                    self._index_expense(exp)
+                self._incomes = {inc["id"]: inc for inc in db.get_user_incomes(self.username)}
+                self._categories = db.get_categories(self.username)
+            self._loaded = True
+        return self
+
+    def holds(self, username):
+        """True when this repository serves username's session"""
+        return username is not None and username == self.username
+
+    # ---------------- Reads ----------------
+
+    def expenses(self):
+        """All expenses, newest first"""
+        with self._lock:
+            self.load()
+            return sorted(self._expenses.values(), key=lambda e: e["date"], reverse=True)
+
+    def expenses_in_period(self, year, month=None):
+        """Expenses of one month, or of a whole year when month is None, newest first"""
+        with self._lock:
+            self.load()
+            months = [month] if month else range(1, 13)
+            exps = [self._expenses[i] for m in months
+                    for i in self._by_period.get((int(year), int(m)), ())]
+        return sorted(exps, key=lambda e: e["date"], reverse=True)
+
+    def expenses_between(self, start_date, end_date):
+        """Expenses dated from start_date through end_date (inclusive dates)"""
+        lo, hi = start_date.toordinal(), end_date.toordinal()
+        with self._lock:
+            self.load()
+            exps = []
+            for (y, m), ids in self._by_period.items():
+                if (y, m) < (start_date.year, start_date.month) or (y, m) > (end_date.year, end_date.month):
+                    continue
+                exps.extend(e for e in (self._expenses[i] for i in ids)
+                            if lo <= e["date_fields"][0] <= hi)
+        return sorted(exps, key=lambda e: e["date"], reverse=True)
+
+    def incomes(self):
+        """All incomes, newest first"""
+        with self._lock:
+            self.load()
+            return sorted(self._incomes.values(), key=lambda i: i["date"], reverse=True)
+
+    def income(self, income_id):
+        with self._lock:
+            self.load()
+            return self._incomes.get(income_id)
+
+    def income_name(self, income_id):
+        inc = self.income(income_id) if income_id else None
+        return inc["name"] if inc else "General"
+
+    def categories(self):
+        with self._lock:
+            self.load()
+            return list(self._categories)
+
+    # ---------------- Writes ----------------
+
+    def add_expense(self, name, category, date, amount, income_id=None):
+        with self._lock:
+            self.load()
+            expense_id = db.add_expense(self.username, name, category, date, amount, income_id)
+            exp = db.get_expense(expense_id)
+            self._index_expense(exp)
+            self._refresh_incomes([income_id])
+        self._emit("expense", "added", [expense_id], [_period_of(exp)])
+        return expense_id
+
+    def update_expense(self, expense_id, name, category, date, amount, income_id=None):
+        with self._lock:
+            self.load()
+            # Database first: if the write raises, the cache still holds the old row
+            db.update_expense(expense_id, name, category, date, amount, income_id)
+            exp = db.get_expense(expense_id)
+            old = self._unindex_expense(expense_id)
+            if exp:
+                self._index_expense(exp)
+            self._refresh_incomes([income_id, old and old["income_id"]])
+        self._emit("expense", "updated", [expense_id],
+                   [_period_of(e) for e in (old, exp) if e])
+
+    def delete_expense(self, expense_id):
+        with self._lock:
+            self.load()
+            db.delete_expense(expense_id)
+            old = self._unindex_expense(expense_id)
+            self._refresh_incomes([old and old["income_id"]])
+        self._emit("expense", "deleted", [expense_id], [_period_of(old)] if old else [])
+
+    def add_income(self, name, amount, date):
+        with self._lock:
+            self.load()
+            income_id = db.add_income(self.username, name, amount, date)
+            self._refresh_incomes([income_id])
+        self._emit("income", "added", [income_id])
+        return income_id
+
+    def update_income(self, income_id, name, amount, date):
+        with self._lock:
+            self.load()
+            db.update_income(income_id, name, amount, date)
+            self._refresh_incomes([income_id])
+        self._emit("income", "updated", [income_id])
+
+    def delete_income(self, income_id):
+        with self._lock:
+            self.load()
+            db.delete_income(income_id)
+            self._incomes.pop(income_id, None)
+            # The database unlinks the income's expenses; mirror that
+            unlinked = [e for e in self._expenses.values() if e["income_id"] == income_id]
+            for exp in unlinked:
+                exp["income_id"] = None
+        self._emit("income", "deleted", [income_id], [_period_of(e) for e in unlinked])
+
+    def add_category(self, category):
+        """Returns False when the category already exists"""
+        with self._lock:
+            self.load()
+            if not db.add_category(self.username, category):
+                return False
+            self._categories = sorted(self._categories + [category])
+        self._emit("category", "added", [category])
+        return True
+
+    def delete_category(self, category):
+        with self._lock:
+            self.load()
+            db.delete_category(self.username, category)
+            self._categories = [c for c in self._categories if c != category]
+        self._emit("category", "deleted", [category])
+
+    # ---------------- Internals ----------------
+
+    def _index_expense(self, exp):
+        # Caller holds self._lock
+        self._expenses[exp["id"]] = exp
+        period = _period_of(exp)
+        if period:
+            self._by_period.setdefault(period, set()).add(exp["id"])
+
+    def _unindex_expense(self, expense_id):
+        # Caller holds self._lock
+        exp = self._expenses.pop(expense_id, None)
+        period = exp and _period_of(exp)
+        if period:
+            self._by_period.get(period, set()).discard(expense_id)
+        return exp
+
+    def _refresh_incomes(self, income_ids):
+        """Re-read incomes whose remaining balance the database just changed"""
+        for income_id in set(filter(None, income_ids)):
+            inc = db.get_income(income_id)
+            if inc:
+                self._incomes[income_id] = inc
+            else:
+                self._incomes.pop(income_id, None)
+
+    def _emit(self, kind, action, ids, periods=()):
+        self.dispatch('on_change', DataChange(kind, action, ids, [p for p in periods if p]))
+
+    def on_change(self, change):
+        pass
+
+    def on_session(self, username):
+        pass
+
+
+# One repository per app; open()/close() switch it between sessions
+repository = DataRepository()
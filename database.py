@@ -1,9 +1,29 @@
 import sqlite3
 import json
+import threading
+import time
+import hashlib
+import hmac
+import secrets
 from datetime import datetime
 
+import utils.utils as utils
+import utils.instrumentation as instrumentation
+
 DB_NAME = "expenses.db"
 
+def _row_to_expense(row):
+    """Build an expense dict from a row, with its date parsed once up front"""
+    return {
+        "id": row[0],
+        "name": row[1],
+        "category": row[2],
+        "date": row[3],
+        "amount": row[4],
+        "income_id": row[5],
+        "date_fields": utils.parse_date_fields(row[3])
+    }
+
 def init_database():
     """Initialize database tables with automatic migration"""
     with sqlite3.connect(DB_NAME) as conn:
@@ -74,13 +94,88 @@ def init_database():
         
         conn.commit()
 
+_db_ready = False
+_db_lock = threading.Lock()
+
+def ensure_database():
+    """Create/migrate the schema once, on first use rather than at import"""
+    global _db_ready
+    if _db_ready:
+        return
+    with _db_lock:
+        if not _db_ready:
+            init_database()
+            _db_ready = True
+
+def _connect():
+    """Open a connection, initializing the schema on the first call"""
+    ensure_database()
+    return sqlite3.connect(DB_NAME)
+
+# ============================================================
+# CREDENTIALS
+# ============================================================
+
+# Stored as "pbkdf2_sha256$<iterations>$<salt hex>$<hash hex>" in users.password;
+# rows still holding a plaintext password are rehashed on their next login
+PASSWORD_SCHEME = "pbkdf2_sha256"
+PASSWORD_TARGET_SECONDS = 0.1      # Hashing cost aimed for on this device
+PASSWORD_MIN_ITERATIONS = 50000    # Anything weaker is rehashed on login
+PASSWORD_MAX_ITERATIONS = 1000000
+
+_password_iterations = None
+_verified = {}                      # username -> (stored hash, keyed digest of the password)
+_verify_key = secrets.token_bytes(32)
+
+def password_iterations():
+    """PBKDF2 iteration count calibrated once per process to PASSWORD_TARGET_SECONDS"""
+    global _password_iterations
+    if _password_iterations is None:
+        probe = 20000
+        start = time.perf_counter()
+        hashlib.pbkdf2_hmac("sha256", b"calibration", b"calibration-salt", probe)
+        elapsed = max(time.perf_counter() - start, 1e-6)
+        its = int(probe * PASSWORD_TARGET_SECONDS / elapsed) // 1000 * 1000
+        _password_iterations = min(max(its, PASSWORD_MIN_ITERATIONS), PASSWORD_MAX_ITERATIONS)
+    return _password_iterations
+
+def hash_password(password, iterations=None):
+    """Salted PBKDF2-SHA256 hash in the stored format"""
+    iterations = iterations or password_iterations()
+    salt = secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"{PASSWORD_SCHEME}${iterations}${salt.hex()}${digest.hex()}"
+
+def _check_password(password, stored):
+    """Returns (matches, needs_rehash) for a stored hash or legacy plaintext"""
+    parts = stored.split("$") if stored else []
+    if len(parts) == 4 and parts[0] == PASSWORD_SCHEME:
+        try:
+            iterations, salt = int(parts[1]), bytes.fromhex(parts[2])
+        except ValueError:
+            return False, False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+        return hmac.compare_digest(digest.hex(), parts[3]), iterations < PASSWORD_MIN_ITERATIONS
+    # Legacy plaintext row
+    return hmac.compare_digest((stored or "").encode("utf-8"), password.encode("utf-8")), True
+
+def _remember_verified(username, stored, password):
+    _verified[username] = (stored, hmac.new(_verify_key, password.encode("utf-8"), "sha256").digest())
+
+def _recently_verified(username, stored, password):
+    """Cheap path: this password already passed PBKDF2 against this exact hash in this process"""
+    cached = _verified.get(username)
+    if not cached or cached[0] != stored:
+        return False
+    return hmac.compare_digest(cached[1], hmac.new(_verify_key, password.encode("utf-8"), "sha256").digest())
+
 def add_user(username, password, email=""):
     """Add new user"""
     try:
-        with sqlite3.connect(DB_NAME) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO users(username, password, email) VALUES(?,?,?)", 
-                         (username, password, email))
+                         (username, hash_password(password), email))
             conn.commit()
             
             # Add default categories
@@ -94,21 +189,47 @@ def add_user(username, password, email=""):
     except sqlite3.IntegrityError:
         return False
 
+@instrumentation.timed("db.authenticate_user")
 def authenticate_user(username, password):
-    """Authenticate user login"""
-    with sqlite3.connect(DB_NAME) as conn:
+    """Authenticate user login, upgrading plaintext or weak hashes in place"""
+    with _connect() as conn:
+        cursor = conn.cursor()
+        # users.username is UNIQUE, so this is a single index lookup
+        cursor.execute("SELECT password FROM users WHERE username=?", (username,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        stored = row[0]
+        if _recently_verified(username, stored, password):
+            return True
+        ok, needs_rehash = _check_password(password, stored)
+        if not ok:
+            return False
+        if needs_rehash:
+            stored = hash_password(password)
+            cursor.execute("UPDATE users SET password=? WHERE username=?", (stored, username))
+            conn.commit()
+        _remember_verified(username, stored, password)
+        return True
+
+def set_password(username, password):
+    """Replace a user's password with a fresh hash"""
+    stored = hash_password(password)
+    with _connect() as conn:
         cursor = conn.cursor()
-        cursor.execute("SELECT * FROM users WHERE username=? AND password=?", 
-                      (username, password))
-        return cursor.fetchone() is not None
+        cursor.execute("UPDATE users SET password=? WHERE username=?", (stored, username))
+        conn.commit()
+        _verified.pop(username, None)
+        return cursor.rowcount > 0
 
 # ============================================================
 # INCOME FUNCTIONS - NEW
 # ============================================================
 
+@instrumentation.timed("db.add_income")
 def add_income(username, name, amount, date):
     """Add income"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO income(username, name, amount, date, remaining) 
@@ -117,9 +238,10 @@ def add_income(username, name, amount, date):
         conn.commit()
         return cursor.lastrowid
 
+@instrumentation.timed("db.get_user_incomes")
 def get_user_incomes(username):
     """Get all incomes for user"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, name, amount, date, remaining 
@@ -140,9 +262,25 @@ def get_user_incomes(username):
             })
         return incomes
 
+def get_income(income_id):
+    """Get one income by ID, or None"""
+    with _connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name, amount, date, remaining FROM income WHERE id=?", (income_id,))
+        row = cursor.fetchone()
+        if not row:
+            return None
+        return {
+            "id": row[0],
+            "name": row[1],
+            "amount": row[2],
+            "date": row[3],
+            "remaining": row[4]
+        }
+
 def update_income_remaining(income_id, new_remaining):
     """Update remaining amount for income"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             UPDATE income 
@@ -151,9 +289,10 @@ def update_income_remaining(income_id, new_remaining):
         """, (new_remaining, income_id))
         conn.commit()
 
+@instrumentation.timed("db.delete_income")
 def delete_income(income_id):
     """Delete income by ID"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         # First, unlink all expenses from this income
         cursor.execute("UPDATE expenses SET income_id=NULL WHERE income_id=?", (income_id,))
@@ -161,9 +300,10 @@ def delete_income(income_id):
         cursor.execute("DELETE FROM income WHERE id=?", (income_id,))
         conn.commit()
 
+@instrumentation.timed("db.update_income")
 def update_income(income_id, name, amount, date):
     """Update income"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         # Get current remaining and original amount
         cursor.execute("SELECT amount, remaining FROM income WHERE id=?", (income_id,))
@@ -184,14 +324,16 @@ def update_income(income_id, name, amount, date):
 # EXPENSE FUNCTIONS - UPDATED
 # ============================================================
 
+@instrumentation.timed("db.add_expense")
 def add_expense(username, name, category, date, amount, income_id=None):
     """Add expense"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             INSERT INTO expenses(username, name, category, date, amount, income_id) 
             VALUES(?,?,?,?,?,?)
         """, (username, name, category, date, amount, income_id))
+        expense_id = cursor.lastrowid
         
         # Update income remaining if linked
         if income_id:
@@ -202,10 +344,24 @@ def add_expense(username, name, category, date, amount, income_id=None):
                 cursor.execute("UPDATE income SET remaining=? WHERE id=?", (new_remaining, income_id))
         
         conn.commit()
+        return expense_id
+
+def get_expense(expense_id):
+    """Get one expense by ID, or None"""
+    with _connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, name, category, date, amount, income_id 
+            FROM expenses 
+            WHERE id=?
+        """, (expense_id,))
+        row = cursor.fetchone()
+        return _row_to_expense(row) if row else None
 
+@instrumentation.timed("db.get_user_expenses")
 def get_user_expenses(username):
     """Get all expenses for user"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, name, category, date, amount, income_id 
@@ -214,22 +370,12 @@ def get_user_expenses(username):
             ORDER BY date DESC
         """, (username,))
         rows = cursor.fetchall()
-        
-        expenses = []
-        for row in rows:
-            expenses.append({
-                "id": row[0],
-                "name": row[1],
-                "category": row[2],
-                "date": row[3],
-                "amount": row[4],
-                "income_id": row[5]
-            })
-        return expenses
+        return [_row_to_expense(row) for row in rows]
 
+@instrumentation.timed("db.delete_expense")
 def delete_expense(expense_id):
     """Delete expense by ID"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         # Get expense details to refund income
         cursor.execute("SELECT amount, income_id FROM expenses WHERE id=?", (expense_id,))
@@ -246,9 +392,10 @@ def delete_expense(expense_id):
         cursor.execute("DELETE FROM expenses WHERE id=?", (expense_id,))
         conn.commit()
 
+@instrumentation.timed("db.update_expense")
 def update_expense(expense_id, name, category, date, amount, income_id=None):
     """Update expense"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         
         # Get old expense data
@@ -281,9 +428,10 @@ def update_expense(expense_id, name, category, date, amount, income_id=None):
         """, (name, category, date, amount, income_id, expense_id))
         conn.commit()
 
+@instrumentation.timed("db.get_categories")
 def get_categories(username):
     """Get categories for user"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM categories WHERE username=? ORDER BY name", 
                       (username,))
@@ -292,7 +440,7 @@ def get_categories(username):
 def add_category(username, category):
     """Add category"""
     try:
-        with sqlite3.connect(DB_NAME) as conn:
+        with _connect() as conn:
             cursor = conn.cursor()
             cursor.execute("INSERT INTO categories(username, name) VALUES(?,?)", 
                          (username, category))
@@ -303,7 +451,7 @@ def add_category(username, category):
 
 def delete_category(username, category):
     """Delete category"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("DELETE FROM categories WHERE username=? AND name=?", 
                       (username, category))
@@ -311,16 +459,17 @@ def delete_category(username, category):
 
 def get_total_expenses(username):
     """Get total expenses amount"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT SUM(amount) FROM expenses WHERE username=?", 
                       (username,))
         result = cursor.fetchone()[0]
         return result if result else 0
 
+@instrumentation.timed("db.get_all_expenses")
 def get_all_expenses(username):
     """Get all expenses for a user"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT id, name, category, date, amount, income_id 
@@ -330,29 +479,20 @@ def get_all_expenses(username):
         """, (username,))
         
         rows = cursor.fetchall()
-        expenses = []
-        for row in rows:
-            expenses.append({
-                "id": row[0],
-                "name": row[1],
-                "category": row[2],
-                "date": row[3],
-                "amount": row[4],
-                "income_id": row[5]
-            })
-        return expenses
+        return [_row_to_expense(row) for row in rows]
 
 def get_expense_count(username):
     """Get count of expenses"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT COUNT(*) FROM expenses WHERE username=?", 
                       (username,))
         return cursor.fetchone()[0]
 
+@instrumentation.timed("db.filter_expenses_by_period")
 def filter_expenses_by_period(username, year, month=None):
     """Filter expenses by year and optional month"""
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         if month:
             cursor.execute("""
@@ -370,27 +510,29 @@ def filter_expenses_by_period(username, year, month=None):
             """, (username, str(year)))
         
         rows = cursor.fetchall()
-        expenses = []
-        for row in rows:
-            expenses.append({
-                "id": row[0],
-                "name": row[1],
-                "category": row[2],
-                "date": row[3],
-                "amount": row[4],
-                "income_id": row[5]
-            })
-        return expenses
+        return [_row_to_expense(row) for row in rows]
+
+@instrumentation.timed("db.filter_expenses_between")
+def filter_expenses_between(username, start_date, end_date):
+    """Expenses dated from start_date through end_date (inclusive, YYYY-MM-DD)"""
+    with _connect() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, name, category, date, amount, income_id 
+            FROM expenses 
+            WHERE username=? AND date >= ? AND date < date(?, '+1 day')
+            ORDER BY date DESC
+        """, (username, str(start_date), str(end_date)))
+        
+        rows = cursor.fetchall()
+        return [_row_to_expense(row) for row in rows]
 
 def get_income_name(income_id):
     """Get income name by ID"""
     if not income_id:
         return "General"
-    with sqlite3.connect(DB_NAME) as conn:
+    with _connect() as conn:
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM income WHERE id=?", (income_id,))
         result = cursor.fetchone()
         return result[0] if result else "General"
-
-# Initialize database on import
-init_database()
\ No newline at end of file
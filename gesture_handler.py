@@ -1,74 +1,121 @@
 # ============================================================
-# FILE 5: utils/gesture_handler.py (UPDATED - if needed)
+# FILE 5: utils/gesture_handler.py
 # ============================================================
+"""
+One gesture pipeline for the whole app
+Every touch is classified once, when it ends, from its start and end
+positions and times (no per-move work). Handlers register for a gesture
+kind with an optional region widget and an optional `active` check; the
+check runs first, so inactive handlers cost a function call and nothing
+else, however many widgets register.
+"""
 
-from kivy.uix.widget import Widget
-from kivy.properties import NumericProperty
-from kivy.clock import Clock
-
-
-class SwipeDetector(Widget):
-    """Detects swipe gestures on a widget"""
-    swipe_threshold = NumericProperty(50)
-    swipe_timeout = NumericProperty(0.5)
-    
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.register_event_type('on_swipe_left')
-        self.register_event_type('on_swipe_right')
-        self.register_event_type('on_swipe_up')
-        self.register_event_type('on_swipe_down')
-        
-        self._touch_start_x = 0
-        self._touch_start_y = 0
-        self._touch_start_time = 0
-        self._is_swiping = False
-    
-    def on_touch_down(self, touch):
-        if self.collide_point(*touch.pos):
-            self._touch_start_x = touch.x
-            self._touch_start_y = touch.y
-            self._touch_start_time = Clock.get_time()
-            self._is_swiping = True
-        return super().on_touch_down(touch)
-    
-    def on_touch_move(self, touch):
-        return super().on_touch_move(touch)
-    
-    def on_touch_up(self, touch):
-        if self.collide_point(*touch.pos) and self._is_swiping:
-            dx = touch.x - self._touch_start_x
-            dy = touch.y - self._touch_start_y
-            dt = Clock.get_time() - self._touch_start_time
-            
-            if dt <= self.swipe_timeout:
-                abs_dx = abs(dx)
-                abs_dy = abs(dy)
-                
-                if abs_dx > abs_dy and abs_dx > self.swipe_threshold:
-                    if dx > 0:
-                        self.dispatch('on_swipe_right')
-                    else:
-                        self.dispatch('on_swipe_left')
-                elif abs_dy > abs_dx and abs_dy > self.swipe_threshold:
-                    if dy > 0:
-                        self.dispatch('on_swipe_up')
-                    else:
-                        self.dispatch('on_swipe_down')
-            
-            self._is_swiping = False
-        
-        return super().on_touch_up(touch)
-    
-    def on_swipe_left(self):
-        pass
-    
-    def on_swipe_right(self):
-        pass
-    
-    def on_swipe_up(self):
-        pass
-    
-    def on_swipe_down(self):
-        pass
+from kivy.core.window import Window
+from kivy.metrics import dp
 
+
+class Gesture:
+    """A classified touch: kind is 'tap', 'long_press', 'swipe' or 'scroll'"""
+    __slots__ = ("kind", "direction", "pos", "opos", "duration", "velocity", "touch")
+
+    def __init__(self, kind, touch, direction=None, duration=0.0, velocity=0.0):
+        self.kind = kind
+        self.direction = direction   # 'left'/'right'/'up'/'down' for swipes
+        self.pos = tuple(touch.pos)
+        self.opos = tuple(touch.opos)
+        self.duration = duration
+        self.velocity = velocity     # pixels per second
+        self.touch = touch
+
+
+class GestureDispatcher:
+    """Classifies window touches and routes them to registered handlers"""
+
+    TAP_SLOP = dp(50)          # farther than this is not a tap
+    LONG_PRESS_TIME = 0.5
+    SWIPE_DISTANCE = dp(80)
+    SWIPE_TIMEOUT = 0.5
+
+    def __init__(self):
+        self._handlers = {"tap": [], "long_press": [], "swipe": [], "scroll": []}
+        self._installed = False
+
+    def install(self):
+        if not self._installed:
+            Window.bind(on_touch_up=self._on_touch_up)
+            self._installed = True
+
+    def uninstall(self):
+        if self._installed:
+            Window.unbind(on_touch_up=self._on_touch_up)
+            self._installed = False
+
+    def register(self, kinds, callback, region=None, active=None):
+        """
+        Call callback(gesture) for gestures of the given kind(s).
+
+        region: only gestures that start and end on this widget.
+        active: cheap zero-argument check; the handler is skipped while it is false.
+        A callback returning True stops later handlers from seeing the gesture.
+        """
+        if isinstance(kinds, str):
+            kinds = (kinds,)
+        entry = (callback, region, active)
+        for kind in kinds:
+            self._handlers[kind].append(entry)
+        return entry
+
+    def unregister(self, entry):
+        for handlers in self._handlers.values():
+            if entry in handlers:
+                handlers.remove(entry)
+
+    @classmethod
+    def classify(cls, touch):
+        if getattr(touch, "is_mouse_scrolling", False):
+            return Gesture("scroll", touch)
+        dx = touch.x - touch.ox
+        dy = touch.y - touch.oy
+        distance = (dx * dx + dy * dy) ** 0.5
+        # time_end is stamped at touch-up; a held press has no moves to bump time_update
+        end = touch.time_end if getattr(touch, "time_end", -1) > 0 else touch.time_update
+        duration = max(end - touch.time_start, 0.0)
+        if distance <= cls.TAP_SLOP:
+            kind = "long_press" if duration >= cls.LONG_PRESS_TIME else "tap"
+            return Gesture(kind, touch, duration=duration)
+        velocity = distance / duration if duration > 0 else 0.0
+        # Only travel along the dominant axis counts towards a swipe
+        if abs(dx) > abs(dy):
+            travel, direction = abs(dx), "right" if dx > 0 else "left"
+        elif abs(dy) > abs(dx):
+            travel, direction = abs(dy), "up" if dy > 0 else "down"
+        else:
+            travel, direction = 0.0, None
+        if direction and travel > cls.SWIPE_DISTANCE and duration <= cls.SWIPE_TIMEOUT:
+            return Gesture("swipe", touch, direction, duration, velocity)
+        return Gesture("scroll", touch, duration=duration, velocity=velocity)
+
+    def _on_touch_up(self, window, touch):
+        try:
+            gesture = self.classify(touch)
+            for callback, region, active in self._handlers[gesture.kind]:
+                if active is not None and not active():
+                    continue
+                if region is not None and not (_window_collide(region, gesture.opos)
+                                               and _window_collide(region, gesture.pos)):
+                    continue
+                if callback(gesture):
+                    break
+        except Exception as e:
+            print("Error in gesture handler:", e)
+        return False
+
+
+def _window_collide(widget, pos):
+    if widget.get_parent_window() is None:
+        return False
+    return widget.collide_point(*widget.to_widget(*pos))
+
+
+# One dispatcher per app, installed by the App on build
+gestures = GestureDispatcher()
@@ -0,0 +1,212 @@
+# utils/instrumentation.py
+"""
+Opt-in hot-path instrumentation
+Set FJ_PROFILE=1 to time the spans below (database calls, aggregation,
+chart drawing, widget building, screen transitions), keep a ring buffer of
+frame times and show a small on-screen overlay with the numbers. With
+FJ_PROFILE=<file.json> the p50/p95/p99 report is also written there when
+the app stops. When FJ_PROFILE is unset, span() returns a shared no-op
+context and timed() returns the function unchanged.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+ENABLED = bool(os.environ.get("FJ_PROFILE"))
+
+SPAN_SAMPLES = 256     # most recent samples kept per span
+FRAME_SAMPLES = 600    # about 10 s at 60 fps
+
+_spans = {}            # name -> deque of durations in ms
+_spans_lock = threading.Lock()   # record() runs on worker threads too
+_frames = deque(maxlen=FRAME_SAMPLES)
+_NULL_SPAN = nullcontext()
+_overlay = None
+_frame_event = None
+_finished = False
+
+
+def record(name, ms):
+    with _spans_lock:
+        samples = _spans.get(name)
+        if samples is None:
+            samples = _spans[name] = deque(maxlen=SPAN_SAMPLES)
+        samples.append(ms)
+
+
+def _span_snapshot():
+    """[(name, samples)] copied under the lock, safe to iterate on any thread"""
+    with _spans_lock:
+        return [(name, list(samples)) for name, samples in _spans.items()]
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, (time.perf_counter() - self.start) * 1000.0)
+        return False
+
+
+def span(name):
+    """Time the wrapped block under name (no-op unless FJ_PROFILE is set)"""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def timed(name):
+    """Decorator form of span(); returns the function untouched when disabled"""
+    def decorate(fn):
+        if not ENABLED:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                record(name, (time.perf_counter() - start) * 1000.0)
+        return wrapper
+    return decorate
+
+
+# ---------------- Reporting ----------------
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int(round(p / 100.0 * (len(ordered) - 1))))]
+
+
+def summarize(samples):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50": round(_percentile(ordered, 50), 3),
+        "p95": round(_percentile(ordered, 95), 3),
+        "p99": round(_percentile(ordered, 99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def stats():
+    """p50/p95/p99 (ms) per span, plus the frame-time ring buffer"""
+    return {
+        "frames_ms": summarize(_frames),
+        "spans_ms": {name: summarize(samples) for name, samples in sorted(_span_snapshot())},
+    }
+
+
+def dump(path=None):
+    """Write stats() to path (default: FJ_PROFILE when it names a .json file)"""
+    env = os.environ.get("FJ_PROFILE", "")
+    path = path or (env if env.endswith(".json") else None)
+    data = stats()
+    if path:
+        try:
+            with open(path, "w") as f:
+                json.dump(data, f, indent=2)
+            print(f"✓ Profile written to {path}")
+        except OSError as e:
+            print(f"✗ Could not write profile: {e}")
+    return data
+
+
+# ---------------- Kivy hooks ----------------
+
+def track_transitions(manager):
+    """Time each screen change from setting `current` to the transition's end"""
+    if not ENABLED:
+        return
+    pending = {}
+
+    def on_current(mgr, name):
+        pending["screen"] = (name, time.perf_counter())
+
+    def on_complete(*args):
+        started = pending.pop("screen", None)
+        if started:
+            record(f"transition:{started[0]}", (time.perf_counter() - started[1]) * 1000.0)
+
+    def on_transition(mgr, transition):
+        transition.bind(on_complete=on_complete)
+
+    manager.bind(current=on_current, transition=on_transition)
+    on_transition(manager, manager.transition)
+
+
+def _on_frame(dt):
+    _frames.append(dt * 1000.0)
+
+
+def install():
+    """Start the frame monitor and show the overlay (call from App.on_start)"""
+    global _frame_event, _overlay
+    if not ENABLED or _frame_event is not None:
+        return
+    from kivy.clock import Clock
+    from kivy.core.window import Window
+
+    _frame_event = Clock.schedule_interval(_on_frame, 0)
+    _overlay = _make_overlay()
+    Window.add_widget(_overlay)
+    Clock.schedule_interval(_refresh_overlay, 0.5)
+
+
+def finish():
+    """Write the report once (call from App.on_stop)"""
+    global _finished
+    if ENABLED and not _finished:
+        _finished = True
+        dump()
+
+
+def _make_overlay():
+    from kivy.uix.label import Label
+    from kivy.graphics import Color, Rectangle
+    from kivy.metrics import dp, sp
+
+    overlay = Label(
+        size_hint=(None, None),
+        font_size=sp(10),
+        halign="left",
+        valign="top",
+        color=(0.6, 1, 0.6, 1),
+        padding=(dp(4), dp(4)),
+    )
+    overlay.bind(texture_size=lambda o, s: setattr(o, "size", s))
+    with overlay.canvas.before:
+        Color(0, 0, 0, 0.6)
+        overlay._bg = Rectangle()
+    overlay.bind(pos=lambda o, v: setattr(o._bg, "pos", v),
+                 size=lambda o, v: setattr(o._bg, "size", v))
+    return overlay
+
+
+def _refresh_overlay(dt):
+    from kivy.core.window import Window
+
+    frames = summarize(_frames)
+    lines = []
+    if frames:
+        fps = 1000.0 / frames["p50"] if frames["p50"] else 0
+        lines.append(f"{fps:.0f} fps  frame p50 {frames['p50']:.1f}  p95 {frames['p95']:.1f}  "
+                     f"p99 {frames['p99']:.1f} ms")
+    slowest = sorted(((summarize(s), name) for name, s in _span_snapshot() if s),
+                     key=lambda item: item[0]["p95"], reverse=True)[:6]
+    for summary, name in slowest:
+        lines.append(f"{name[:28]:<28} p95 {summary['p95']:>7.1f} ms  n={summary['count']}")
+    _overlay.text = "\n".join(lines)
+    _overlay.pos = (0, Window.height - _overlay.height)
@@ -3,19 +3,65 @@
 # ============================================================
 
 from kivy.uix.widget import Widget
-from kivy.properties import ListProperty, NumericProperty, StringProperty
-from kivy.graphics import Color, Rectangle
+from kivy.properties import ListProperty, NumericProperty, StringProperty, ObjectProperty
+from kivy.graphics import Color, Rectangle, Ellipse, Line, Mesh, InstructionGroup
 from kivy.metrics import dp, sp
 from kivy.core.text import Label as CoreLabel
 from kivy.clock import Clock
 from kivy.uix.label import Label
-from datetime import datetime
+from kivy.utils import get_color_from_hex
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import date
+import calendar
+import math
+
+import utils.chart_utils as chart_utils
+import utils.instrumentation as instrumentation
+
+
+class LabelTextureCache:
+    """
+    Bounded LRU of rasterized label textures, shared by every chart widget.
+    Keyed by (text, font_size, color, bold, font_name) so redraws reuse
+    textures instead of running the font engine again.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._textures = OrderedDict()
+
+    def get(self, text, font_size, color=(1, 1, 1, 1), bold=False, font_name=None):
+        key = (text, font_size, tuple(color), bold, font_name)
+        tex = self._textures.get(key)
+        if tex is not None:
+            self._textures.move_to_end(key)
+            return tex
+
+        kwargs = {'text': text, 'font_size': font_size, 'color': color, 'bold': bold}
+        if font_name:
+            kwargs['font_name'] = font_name
+        lbl = CoreLabel(**kwargs)
+        lbl.refresh()
+        tex = lbl.texture
+        self._textures[key] = tex
+        if len(self._textures) > self.max_entries:
+            self._textures.popitem(last=False)
+        return tex
+
+    def clear(self):
+        self._textures.clear()
+
+
+label_textures = LabelTextureCache()
 
 
 class InteractiveBarChart(Widget):
     """
     Lightweight Kivy widget that draws a bar chart and handles touches.
     Dispatches 'on_selection' with (selected_index_or_None, filtered_expenses_or_None)
+    set_timeline() switches to a zoom/pan view of the whole history; drag pans,
+    pinch or the mouse wheel zooms, and a tap selects the bucket under it.
     """
     labels = ListProperty([])
     values = ListProperty([])
@@ -25,20 +71,79 @@ class InteractiveBarChart(Widget):
     year = NumericProperty(0)
     month = NumericProperty(0)
 
+    BAR_COLOR = (0.15, 0.6, 0.95, 1)
+    SELECTED_COLOR = (0.95, 0.45, 0.15, 1)
+    EMPTY_COLOR = (0.3, 0.3, 0.3, 0.5)
+
+    # Timeline (zoom/pan) mode
+    TIMELINE = "Timeline"
+    MIN_SPAN_DAYS = 14        # deepest zoom
+    MIN_BUCKET_PX = 3         # coarser pyramid level once buckets get thinner than this (dp)
+    MAX_AXIS_LABELS = 8
+    TREND_COLOR = (1.0, 0.8, 0.3, 0.9)
+    TREND_POINT_PX = 2        # one downsampled daily point per this many dp
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.register_event_type('on_selection')
         self.tooltip = None
+        self._tooltip_idx = -1
+        self._hover_x = None
+        self._trigger_hover = Clock.create_trigger(self._update_hover, -1)
+        self._bucket_index = {}
+
+        # Per-bar instruction groups, reused across redraws
+        self._bars = []
+        self._content_dirty = True
+        self._geometry_dirty = True
+        self._drawn_selected = -1
+
+        with self.canvas:
+            self._bg_color = Color(0.05, 0.05, 0.05, 0)
+            self._bg = Rectangle(pos=self.pos, size=self.size)
+        self._bar_layer = InstructionGroup()
+        self.canvas.add(self._bar_layer)
+
+        # Timeline mode: a pooled set of rectangles for the visible buckets only
+        self._pyramid = None
+        self._view = (0.0, 1.0)
+        self._tl_level = None
+        self._tl_selected = None      # (start, end) ordinals of the selected bucket
+        self._tl_touches = {}
+        self._pinch = None
+        self._tl_rects = []
+        self._tl_label_rects = []
+        self._tl_layer = InstructionGroup()
+        self._tl_bars = InstructionGroup()
+        self._tl_labels = InstructionGroup()
+        self._tl_highlight = Rectangle(size=(0, 0))
+        self._tl_layer.add(Color(*self.SELECTED_COLOR[:3], 0.25))
+        self._tl_layer.add(self._tl_highlight)
+        self._tl_layer.add(Color(*self.BAR_COLOR))
+        self._tl_layer.add(self._tl_bars)
+        # Daily spending trend over week/month bars, reduced to the pixel width
+        self._tl_band = Mesh(mode='triangle_strip')
+        self._tl_layer.add(Color(*self.TREND_COLOR[:3], 0.25))
+        self._tl_layer.add(self._tl_band)
+        self._tl_trend = Line(points=[], width=1)
+        self._tl_layer.add(Color(*self.TREND_COLOR))
+        self._tl_layer.add(self._tl_trend)
+        self._tl_layer.add(Color(1, 1, 1, 1))
+        self._tl_layer.add(self._tl_labels)
+        self.canvas.add(self._tl_layer)
+
+        # Coalesces property changes into a single redraw per frame
+        self._trigger_redraw = Clock.create_trigger(self._redraw, -1)
         self.bind(
-            pos=self._redraw,
-            size=self._redraw,
-            labels=self._redraw,
-            values=self._redraw,
-            selected_index=self._redraw
+            pos=self._on_geometry_change,
+            size=self._on_geometry_change,
+            labels=self._on_content_change,
+            values=self._on_content_change,
+            selected_index=self._on_selected_index
         )
 
     def set_data(self, labels, values, expenses, year=None, month=None, mode="Daily"):
-        """Set chart data and redraw"""
+        """Set chart data; the chart redraws once on the next frame"""
         self.labels = labels[:] if labels is not None else []
         self.values = values[:] if values is not None else []
         self.expenses = expenses[:] if expenses is not None else []
@@ -48,113 +153,430 @@ class InteractiveBarChart(Widget):
             self.month = month
         self.mode = mode or "Daily"
         self.selected_index = -1
-        Clock.schedule_once(lambda dt: self._redraw(), 0)
+        self._build_bucket_index()
+        if self._pyramid is not None:
+            self._pyramid = None
+            self._clear_timeline()
+
+    def set_timeline(self, expenses):
+        """Show the whole expense history as a zoomable, pannable daily series"""
+        self.labels = []
+        self.values = []
+        self.expenses = expenses[:] if expenses is not None else []
+        self.mode = self.TIMELINE
+        self.selected_index = -1
+        self._bucket_index = {}
+        self._tl_selected = None
+        self._pyramid = chart_utils.TimeSeriesPyramid(self.expenses)
+        if self._pyramid.first is not None:
+            self._view = (float(self._pyramid.first), float(self._pyramid.last))
+        self._trigger_redraw()
+
+    def _build_bucket_index(self):
+        try:
+            year, month = int(self.year), int(self.month)
+        except Exception:
+            self._bucket_index = {}
+            return
+        self._bucket_index = chart_utils.build_bucket_index(self.expenses or [], self.mode, year, month)
+
+    def _on_geometry_change(self, *args):
+        self._geometry_dirty = True
+        self._trigger_redraw()
 
+    def _on_content_change(self, *args):
+        self._content_dirty = True
+        self._trigger_redraw()
+
+    def _on_selected_index(self, instance, value):
+        """Recolour only the previously and newly selected bars"""
+        if self._content_dirty:
+            return  # a full refresh is already pending
+        for i in (self._drawn_selected, int(value)):
+            if 0 <= i < len(self._bars):
+                self._bars[i]['color'].rgba = self._bar_rgba(i)
+        self._drawn_selected = int(value)
+
+    def _bar_rgba(self, i):
+        val = self.values[i]
+        if val == 0:
+            return self.EMPTY_COLOR
+        if self.selected_index == i:
+            return self.SELECTED_COLOR
+        return self.BAR_COLOR
+
+    def _layout(self):
+        """Return (start_x, slot, bar_w, base_y, top_available, maxv) for the current size"""
+        pad_x = dp(16)
+        bottom_pad = dp(40)
+        n = max(len(self.values), 1)
+        top_available = max(self.height - bottom_pad - dp(10), dp(10))
+        total_w = max(self.width - pad_x * 2, dp(10))
+        slot = total_w / n
+        bar_w = max(slot * 0.7, dp(6))
+        maxv = max(self.values) if self.values and max(self.values) > 0 else 1.0
+        return self.x + pad_x, slot, bar_w, self.y + bottom_pad, top_available, maxv
+
+    @instrumentation.timed("chart.bar_redraw")
     def _redraw(self, *args):
-        """Redraw the chart"""
-        self.canvas.clear()
-        if not self.values or len(self.values) == 0:
+        """Apply pending content and geometry changes to the existing instructions"""
+        if self._content_dirty:
+            self._sync_bars()
+            self._content_dirty = False
+            self._geometry_dirty = True
+        if self._geometry_dirty:
+            self._update_geometry()
+            self._geometry_dirty = False
+        if self._pyramid is not None:
+            self._update_timeline()
+
+    def _sync_bars(self):
+        """Match instruction groups to the data and refresh colours and textures"""
+        n = len(self.values)
+        while len(self._bars) < n:
+            group = InstructionGroup()
+            color = Color(*self.BAR_COLOR)
+            rect = Rectangle()
+            value_rect = Rectangle()
+            label_rect = Rectangle()
+            for instr in (color, rect, Color(1, 1, 1, 1), value_rect, label_rect):
+                group.add(instr)
+            self._bar_layer.add(group)
+            self._bars.append({
+                'group': group, 'color': color, 'rect': rect,
+                'value_rect': value_rect, 'label_rect': label_rect
+            })
+        while len(self._bars) > n:
+            self._bar_layer.remove(self._bars.pop()['group'])
+
+        self._bg_color.a = 1 if n else 0
+        for i, bar in enumerate(self._bars):
+            val = self.values[i]
+            bar['color'].rgba = self._bar_rgba(i)
+            self._set_text(bar['value_rect'], f"{val:,.0f}" if val > 0 else "", sp(8))
+            label_text = str(self.labels[i]) if i < len(self.labels) else ""
+            self._set_text(bar['label_rect'], label_text, sp(12))
+        self._drawn_selected = int(self.selected_index)
+
+    @staticmethod
+    def _set_text(rect, text, font_size):
+        if text:
+            tex = label_textures.get(text, font_size)
+            rect.texture = tex
+            rect.size = tex.size
+        else:
+            rect.texture = None
+            rect.size = (0, 0)
+
+    def _update_geometry(self):
+        """Reposition bars and labels without touching colours or textures"""
+        self._bg.pos = self.pos
+        self._bg.size = self.size
+        if not self._bars:
             return
-        
-        with self.canvas:
-            # Background
-            Color(0.05, 0.05, 0.05, 1)
-            Rectangle(pos=self.pos, size=self.size)
-
-            pad_x = dp(16)
-            bottom_pad = dp(40)
-            top_available = max(self.height - bottom_pad - dp(10), dp(10))
-            n = len(self.values)
-            if n == 0:
-                return
-            
-            total_w = max(self.width - pad_x * 2, dp(10))
-            slot = total_w / n
-            bar_w = max(slot * 0.7, dp(6))
-            maxv = max(self.values) if max(self.values) > 0 else 1.0
-
-            start_x = self.x + pad_x
-            for i, val in enumerate(self.values):
-                h = (val / maxv) * top_available if maxv > 0 else 0
-                bx = start_x + i * slot + (slot - bar_w) / 2
-                by = self.y + bottom_pad
-                
-                # Bar color
-                if val == 0:
-                    Color(0.3, 0.3, 0.3, 0.5)
-                elif self.selected_index == i:
-                    Color(0.95, 0.45, 0.15, 1)
-                else:
-                    Color(0.15, 0.6, 0.95, 1)
-                
-                Rectangle(pos=(bx, by), size=(bar_w, h))
-
-                # Value text
-                if val > 0:
-                    txt = f"{val:,.0f}"
-                    lbl = CoreLabel(text=txt, font_size=sp(8))
-                    lbl.refresh()
-                    tex = lbl.texture
-                    tx = bx + (bar_w - tex.width) / 2
-                    ty = by + h + dp(2)
-                    Color(1, 1, 1, 1)
-                    Rectangle(texture=tex, pos=(tx, ty), size=tex.size)
-
-                # Label below
-                label_text = str(self.labels[i]) if i < len(self.labels) else ""
-                if label_text:
-                    lbl2 = CoreLabel(text=label_text, font_size=sp(12))
-                    lbl2.refresh()
-                    tex2 = lbl2.texture
-                    tx2 = bx + (bar_w - tex2.width) / 2
-                    ty2 = self.y + dp(8)
-                    Color(1, 1, 1, 1)
-                    Rectangle(texture=tex2, pos=(tx2, ty2), size=tex2.size)
+
+        start_x, slot, bar_w, by, top_available, maxv = self._layout()
+        for i, bar in enumerate(self._bars):
+            h = (self.values[i] / maxv) * top_available
+            bx = start_x + i * slot + (slot - bar_w) / 2
+            bar['rect'].pos = (bx, by)
+            bar['rect'].size = (bar_w, h)
+
+            vw, vh = bar['value_rect'].size
+            bar['value_rect'].pos = (bx + (bar_w - vw) / 2, by + h + dp(2))
+            lw, lh = bar['label_rect'].size
+            bar['label_rect'].pos = (bx + (bar_w - lw) / 2, self.y + dp(8))
+
+    # ------------------------------------------------------------
+    # Timeline mode
+    # ------------------------------------------------------------
+
+    def _plot_area(self):
+        """(x, width) of the horizontal plotting area"""
+        pad_x = dp(16)
+        return self.x + pad_x, max(self.width - pad_x * 2, dp(10))
+
+    def _clear_timeline(self):
+        self._tl_bars.clear()
+        self._tl_labels.clear()
+        self._tl_rects = []
+        self._tl_label_rects = []
+        self._tl_highlight.size = (0, 0)
+        self._tl_trend.points = []
+        self._tl_band.vertices, self._tl_band.indices = [], []
+
+    @staticmethod
+    def _pooled(pool, group, n):
+        while len(pool) < n:
+            rect = Rectangle(size=(0, 0))
+            group.add(rect)
+            pool.append(rect)
+        for rect in pool[n:]:
+            rect.size = (0, 0)
+
+    def _update_timeline(self):
+        """Draw only the pyramid buckets that fall inside the viewport"""
+        p = self._pyramid
+        self._bg_color.a = 1
+        if p.first is None:
+            self._clear_timeline()
+            return
+
+        px, pw = self._plot_area()
+        by = self.y + dp(40)
+        top_available = max(self.height - dp(40) - dp(10), dp(10))
+        start, end = self._view
+        scale = pw / (end - start)
+
+        level = p.level_for(end - start, pw / dp(self.MIN_BUCKET_PX))
+        lo, hi = p.visible(level, start, end)
+        self._tl_level = level
+        starts, ends, totals = p.starts[level], p.ends[level], p.totals[level]
+        maxv = max(totals[lo:hi], default=0) or 1.0
+
+        self._pooled(self._tl_rects, self._tl_bars, hi - lo)
+        for rect, i in zip(self._tl_rects, range(lo, hi)):
+            x0 = px + (starts[i] - start) * scale
+            x1 = x0 + max((ends[i] - starts[i]) * scale * 0.8, 1)
+            x0, x1 = max(x0, px), min(x1, px + pw)
+            rect.pos = (x0, by)
+            rect.size = (max(x1 - x0, 0), totals[i] / maxv * top_available)
+
+        self._update_trend(level, px, pw, by, top_available)
+
+        if self._tl_selected:
+            s, e = self._tl_selected
+            x0 = max(px + (s - start) * scale, px)
+            x1 = min(px + (e - start) * scale, px + pw)
+            self._tl_highlight.pos = (x0, by)
+            self._tl_highlight.size = (max(x1 - x0, 0), top_available)
+        else:
+            self._tl_highlight.size = (0, 0)
+
+        ticks = self._axis_ticks(start, end)
+        self._pooled(self._tl_label_rects, self._tl_labels, len(ticks))
+        for rect, (ordinal, text) in zip(self._tl_label_rects, ticks):
+            tex = label_textures.get(text, sp(10))
+            rect.texture = tex
+            rect.size = tex.size
+            rect.pos = (px + (ordinal - start) * scale, self.y + dp(8))
+
+    def _update_trend(self, level, px, pw, by, top_available):
+        """
+        LTTB-reduced daily totals for the viewport over their min/max band,
+        drawn when bars are coarser than a day
+        """
+        if level == "day":
+            self._tl_trend.points = []
+            self._tl_band.vertices, self._tl_band.indices = [], []
+            return
+        p = self._pyramid
+        start, end = self._view
+        # Budget one point per TREND_POINT_PX, with the density snapped down to
+        # a power of two so zooming switches between a few whole-history series
+        # cached on the pyramid and panning only slices them
+        per_day = pw / dp(self.TREND_POINT_PX) / (end - start)
+        per_day = 2.0 ** math.floor(math.log2(per_day))
+        n_out = max(int((p.last - p.first) * per_day), 3)
+        xs, ys = p.trend(n_out)
+        lo, hi = bisect_left(xs, start), bisect_right(xs, end)
+        xs, ys = xs[lo:hi], ys[lo:hi]
+        bx, mins, maxs = p.envelope(n_out)
+        blo, bhi = bisect_left(bx, start), bisect_right(bx, end)
+        bx, mins, maxs = bx[blo:bhi], mins[blo:bhi], maxs[blo:bhi]
+
+        maxv = max(max(maxs, default=0), max(ys, default=0)) or 1.0
+        scale = pw / (end - start)
+        points = []
+        for o, v in zip(xs, ys):
+            points.append(min(max(px + (o - start) * scale, px), px + pw))
+            points.append(by + v / maxv * top_available)
+        self._tl_trend.points = points
+
+        vertices = []
+        for o, vmin, vmax in zip(bx, mins, maxs):
+            x = min(max(px + (o - start) * scale, px), px + pw)
+            vertices.extend((x, by + vmin / maxv * top_available, 0, 0,
+                             x, by + vmax / maxv * top_available, 0, 0))
+        self._tl_band.vertices = vertices
+        self._tl_band.indices = list(range(len(vertices) // 4))
+
+    def _axis_ticks(self, start, end):
+        """[(ordinal, text)] at year, month or week boundaries inside the viewport"""
+        first = date.fromordinal(max(int(start), 1))
+        span = end - start
+        ticks = []
+        if span > 3 * 365:
+            step = max(1, int(span / 365 / self.MAX_AXIS_LABELS) + 1)
+            for y in range(first.year + 1, date.fromordinal(int(end)).year + 1, step):
+                ticks.append((date(y, 1, 1).toordinal(), str(y)))
+        elif span > 90:
+            step = max(1, int(span / 30.44 / self.MAX_AXIS_LABELS) + 1)
+            y, m = first.year, first.month
+            while True:
+                m += step
+                y, m = y + (m - 1) // 12, (m - 1) % 12 + 1
+                o = date(y, m, 1).toordinal()
+                if o >= end:
+                    break
+                ticks.append((o, f"{calendar.month_abbr[m]} {y % 100:02d}"))
+        else:
+            step = 7 * max(1, int(span / 7 / self.MAX_AXIS_LABELS) + 1)
+            o = int(start) - first.weekday() + 7
+            while o < end:
+                d = date.fromordinal(o)
+                ticks.append((o, f"{calendar.month_abbr[d.month]} {d.day}"))
+                o += step
+        return [t for t in ticks if start <= t[0] < end]
+
+    def _set_view(self, start, span):
+        """Clamp and apply a new viewport, then schedule a redraw"""
+        p = self._pyramid
+        full = max(p.last - p.first, self.MIN_SPAN_DAYS)
+        span = min(max(span, self.MIN_SPAN_DAYS), full)
+        start = min(max(start, p.first), p.first + full - span)
+        self._view = (start, start + span)
+        self._trigger_redraw()
+
+    def _ordinal_at(self, x):
+        px, pw = self._plot_area()
+        start, end = self._view
+        return start + (x - px) / pw * (end - start)
+
+    def _zoom(self, factor, anchor_x):
+        """Scale the viewport span by factor, keeping the day under anchor_x fixed"""
+        px, pw = self._plot_area()
+        start, end = self._view
+        anchor = self._ordinal_at(anchor_x)
+        span = (end - start) * factor
+        self._set_view(anchor - (anchor_x - px) / pw * span, span)
+
+    def _timeline_bucket_at(self, x):
+        """(index, start, end) of the bucket under x at the drawn level, or None"""
+        level = self._tl_level
+        if level is None:
+            return None
+        p = self._pyramid
+        ordinal = self._ordinal_at(x)
+        i = bisect_right(p.starts[level], ordinal) - 1
+        if i < 0 or ordinal >= p.ends[level][i]:
+            return None
+        return i, p.starts[level][i], p.ends[level][i]
+
+    def _timeline_touch_down(self, touch):
+        if self._pyramid.first is None:
+            return True
+        if touch.is_mouse_scrolling:
+            if touch.button in ('scrolldown', 'scrollup'):
+                self._zoom(0.8 if touch.button == 'scrolldown' else 1.25, touch.x)
+            return True
+        touch.grab(self)
+        touch.ud['tl_moved'] = False
+        self._tl_touches[touch.uid] = touch
+        if len(self._tl_touches) == 2:
+            a, b = self._tl_touches.values()
+            self._pinch = (abs(a.x - b.x) or 1.0, self._view, (a.x + b.x) / 2)
+        return True
+
+    def _timeline_touch_move(self, touch):
+        if abs(touch.x - touch.ox) > dp(8):
+            touch.ud['tl_moved'] = True
+        if self._pinch and len(self._tl_touches) == 2:
+            a, b = self._tl_touches.values()
+            dist0, view0, cx = self._pinch
+            self._view = view0
+            self._zoom(dist0 / (abs(a.x - b.x) or 1.0), cx)
+            return True
+        _, pw = self._plot_area()
+        start, end = self._view
+        self._set_view(start - (touch.x - touch.px) / pw * (end - start), end - start)
+        return True
+
+    def _timeline_touch_up(self, touch):
+        touch.ungrab(self)
+        self._tl_touches.pop(touch.uid, None)
+        if len(self._tl_touches) < 2:
+            self._pinch = None
+        if touch.ud.get('tl_moved') or self._tl_touches:
+            return True
+
+        hit = self._timeline_bucket_at(touch.x)
+        if hit is None or (self._tl_selected and self._tl_selected == hit[1:]):
+            self._tl_selected = None
+            self.dispatch('on_selection', None, None)
+        else:
+            i, s, e = hit
+            self._tl_selected = (s, e)
+            members = self._pyramid.members[self._tl_level][i]
+            self.dispatch('on_selection', i, [self.expenses[pos] for pos in members])
+        self._trigger_redraw()
+        return True
+
+    def _bar_index_at(self, x):
+        """Index of the bar slot under x, or -1"""
+        n = len(self.values)
+        if n == 0:
+            return -1
+        start_x, slot, _, _, _, _ = self._layout()
+        idx = int((x - start_x) // slot)
+        return idx if 0 <= idx < n else -1
 
     def show_tooltip(self, idx, bx, by, bar_w, h):
-        """Show tooltip on hover"""
-        if self.tooltip:
-            self.remove_widget(self.tooltip)
-        val = self.values[idx]
-        label = self.labels[idx] if idx < len(self.labels) else ""
-        txt = f"{label}: {val:,.0f}"
-        self.tooltip = Label(
-            text=txt,
-            size_hint=(None, None),
-            font_size=sp(13),
-            color=(1, 1, 1, 1),
-            bold=True,
-            background_color=(0.15, 0.15, 0.15, 0.95),
-            padding=(dp(8), dp(4))
-        )
+        """Show tooltip over a bar; text is only re-rendered when the bar changes"""
+        if self.tooltip is None:
+            self.tooltip = Label(
+                size_hint=(None, None),
+                font_size=sp(13),
+                color=(1, 1, 1, 1),
+                bold=True,
+                padding=(dp(8), dp(4))
+            )
+            # Label has no background_color; draw the backdrop behind the text
+            with self.tooltip.canvas.before:
+                Color(0.15, 0.15, 0.15, 0.95)
+                bg = Rectangle()
+            self.tooltip.bind(
+                texture_size=self.tooltip.setter('size'),
+                pos=lambda w, v: setattr(bg, 'pos', v),
+                size=lambda w, v: setattr(bg, 'size', v)
+            )
+        if self._tooltip_idx != idx:
+            val = self.values[idx]
+            label = self.labels[idx] if idx < len(self.labels) else ""
+            self.tooltip.text = f"{label}: {val:,.0f}"
+            self.tooltip.texture_update()
+            self._tooltip_idx = idx
+        if self.tooltip.parent is None:
+            self.add_widget(self.tooltip)
         self.tooltip.pos = (bx + bar_w/2 - self.tooltip.width/2, by + h + dp(24))
-        self.add_widget(self.tooltip)
 
     def hide_tooltip(self):
-        """Hide tooltip"""
-        if self.tooltip:
+        """Hide tooltip (the widget is kept for reuse)"""
+        self._hover_x = None
+        if self.tooltip is not None and self.tooltip.parent is not None:
             self.remove_widget(self.tooltip)
-            self.tooltip = None
+        self._tooltip_idx = -1
+
+    def _update_hover(self, *args):
+        """Place the tooltip for the latest hover position; runs at most once per frame"""
+        idx = self._bar_index_at(self._hover_x) if self._hover_x is not None else -1
+        if idx < 0 or self.values[idx] == 0:
+            self.hide_tooltip()
+            return
+        start_x, slot, bar_w, by, top_available, maxv = self._layout()
+        h = (self.values[idx] / maxv) * top_available
+        bx = start_x + idx * slot + (slot - bar_w) / 2
+        self.show_tooltip(idx, bx, by, bar_w, h)
 
     def on_touch_down(self, touch):
         """Handle touch down"""
         if not self.collide_point(*touch.pos):
             return super().on_touch_down(touch)
-        
-        pad_x = dp(16)
-        n = len(self.values)
-        if n == 0:
-            return True
-        
-        total_w = max(self.width - pad_x * 2, dp(10))
-        slot = total_w / n
-        local_x = touch.x - (self.x + pad_x)
-        idx = int(local_x // slot)
-        
-        if idx < 0 or idx >= n:
-            return True
+        if self._pyramid is not None:
+            return self._timeline_touch_down(touch)
 
-        if self.values[idx] == 0:
+        idx = self._bar_index_at(touch.x)
+        if idx < 0 or self.values[idx] == 0:
             return True
 
         # Toggle selection
@@ -172,62 +594,267 @@ class InteractiveBarChart(Widget):
 
     def on_touch_move(self, touch):
         """Handle touch move for tooltip"""
+        if touch.grab_current is self:
+            return self._timeline_touch_move(touch)
         if not self.collide_point(*touch.pos):
             self.hide_tooltip()
             return False
-        
-        pad_x = dp(16)
-        n = len(self.values)
-        if n == 0:
-            self.hide_tooltip()
-            return False
-        
-        total_w = max(self.width - pad_x * 2, dp(10))
-        slot = total_w / n
-        local_x = touch.x - (self.x + pad_x)
-        idx = int(local_x // slot)
-        
-        if idx < 0 or idx >= n or self.values[idx] == 0:
-            self.hide_tooltip()
-            return False
-        
-        bar_w = max(slot * 0.7, dp(6))
-        h = (self.values[idx] / max(self.values)) * max(self.height - dp(40) - dp(10), dp(10))
-        bx = self.x + pad_x + idx * slot + (slot - bar_w) / 2
-        by = self.y + dp(40)
-        self.show_tooltip(idx, bx, by, bar_w, h)
+
+        # Move events can arrive many times per frame; keep the latest
+        # position and hit-test it once, in the hover trigger
+        self._hover_x = touch.x
+        self._trigger_hover()
         return True
 
     def on_touch_up(self, touch):
         """Handle touch up"""
+        if touch.grab_current is self:
+            return self._timeline_touch_up(touch)
         self.hide_tooltip()
         return super().on_touch_up(touch)
 
     def _filter_expenses_for_index(self, idx):
-        """Filter expenses for selected bar index"""
-        filtered = []
-        for e in (self.expenses or []):
-            ds = e.get("date", "")[:10]
-            try:
-                dt = datetime.strptime(ds, "%Y-%m-%d")
-            except Exception:
-                continue
-            
-            try:
-                if self.mode == "Monthly":
-                    month_idx = idx + 1
-                    if dt.year == int(self.year) and dt.month == month_idx:
-                        filtered.append(e)
-                elif self.mode == "Daily":
-                    day_idx = idx + 1
-                    if dt.year == int(self.year) and dt.month == int(self.month) and dt.day == day_idx:
-                        filtered.append(e)
-             
-            except Exception:
-                continue
-        
-        return filtered
+        """Expenses in the bar at idx, looked up in the index built by set_data"""
+        return [self.expenses[pos] for pos in self._bucket_index.get(idx, ())]
 
     def on_selection(self, index, expenses):
         """Event placeholder"""
-        pass
\ No newline at end of file
+        pass
+
+
+class InteractiveDonutChart(Widget):
+    """
+    Kivy-canvas donut chart with a legend, drawn without matplotlib.
+    The donut fills the left half and the legend the right half.
+    Dispatches 'on_category_selection' with the tapped category, or None
+    when the tap misses both the ring and the legend rows.
+    """
+    selected_category = ObjectProperty(None, allownone=True)
+
+    HOLE_RATIO = 0.55        # inner radius / outer radius (matplotlib width=0.45)
+    EXPLODE_RATIO = 0.12     # exploded slice offset / outer radius
+    SEGMENT_DEG = 3.0        # arc resolution of each wedge
+    LEGEND_X = 0.55          # legend start, as a fraction of the width
+    EDGE_COLOR = (0.10, 0.10, 0.10, 1)
+    TEXT_COLOR = (0.69, 0.69, 0.69, 1)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.register_event_type('on_category_selection')
+        self._categories = []
+        self._values = []
+        self._total = 0
+        # Wedge start angles in degrees, clockwise from 12 o'clock, for bisect hit-testing
+        self._start_angles = []
+        self._wedges = []
+        self._rows = []
+        self._geom = None
+
+        self._wedge_layer = InstructionGroup()
+        self._legend_layer = InstructionGroup()
+        self.canvas.add(self._wedge_layer)
+        self.canvas.add(self._legend_layer)
+
+        self._trigger_geometry = Clock.create_trigger(self._update_geometry, -1)
+        self.bind(pos=self._trigger_geometry, size=self._trigger_geometry)
+
+    def set_data(self, cat_data, selected_category=None):
+        """Set {category: amount} data; unchanged data only updates the selection"""
+        categories = list(cat_data.keys()) if cat_data else []
+        values = [float(v) for v in cat_data.values()] if cat_data else []
+
+        if categories == self._categories and values == self._values:
+            self.selected_category = selected_category
+            return
+
+        self._categories = categories
+        self._values = values
+        self._total = sum(values)
+
+        self._start_angles = []
+        acc = 0.0
+        for v in values:
+            self._start_angles.append(acc)
+            acc += (v / self._total * 360.0) if self._total > 0 else 0
+
+        self._ensure_instructions(len(categories))
+        for i in range(len(categories)):
+            rgba = self._color_for(i)
+            self._wedges[i]['color'].rgba = rgba
+            self._rows[i]['marker_color'].rgba = rgba
+
+        self.selected_category = selected_category
+        # Row textures are keyed, so this is a no-op for rows already restyled above
+        for i in range(len(categories)):
+            self._update_row_text(i)
+        self._trigger_geometry()
+
+    def _color_for(self, i):
+        return get_color_from_hex(chart_utils.DONUT_COLORS[i % len(chart_utils.DONUT_COLORS)])
+
+    def _ensure_instructions(self, n):
+        """Grow or shrink the per-wedge and per-row instruction groups to n"""
+        while len(self._wedges) < n:
+            group = InstructionGroup()
+            color = Color(1, 1, 1, 1)
+            mesh = Mesh(mode='triangle_strip')
+            group.add(color)
+            group.add(mesh)
+            group.add(Color(*self.EDGE_COLOR))
+            edge = Line(width=dp(1.2), close=True)
+            group.add(edge)
+            self._wedge_layer.add(group)
+            self._wedges.append({'group': group, 'color': color, 'mesh': mesh, 'edge': edge})
+
+            row = InstructionGroup()
+            marker_color = Color(1, 1, 1, 1)
+            marker = Ellipse()
+            text_color = Color(*self.TEXT_COLOR)
+            text = Rectangle()
+            for instr in (marker_color, marker, text_color, text):
+                row.add(instr)
+            self._legend_layer.add(row)
+            self._rows.append({
+                'group': row, 'marker_color': marker_color, 'marker': marker,
+                'text_color': text_color, 'text': text, 'key': None
+            })
+
+        while len(self._wedges) > n:
+            self._wedge_layer.remove(self._wedges.pop()['group'])
+            self._legend_layer.remove(self._rows.pop()['group'])
+
+    def _legend_font_size(self):
+        n = max(len(self._categories), 1)
+        return min(sp(11), (self.height / n) * 0.6) if self.height > 0 else sp(11)
+
+    def _update_row_text(self, i):
+        """Re-rasterize a legend row only when its text, weight or size changed"""
+        row = self._rows[i]
+        selected = self._categories[i] == self.selected_category
+        text = chart_utils.format_legend_label(
+            self._categories[i], self._values[i], self._total, selected
+        )
+        font_size = self._legend_font_size()
+        key = (text, selected, font_size)
+        if row['key'] != key:
+            tex = label_textures.get(text, font_size, bold=selected, font_name='RobotoMono-Regular')
+            row['text'].texture = tex
+            row['text'].size = tex.size
+            row['key'] = key
+        row['text_color'].rgba = self._color_for(i) if selected else self.TEXT_COLOR
+
+    def on_selected_category(self, instance, value):
+        """Restyle legend rows and re-offset wedges without rebuilding instructions"""
+        for i in range(len(self._categories)):
+            self._update_row_text(i)
+        self._trigger_geometry()
+
+    def _ring(self, cx, cy, r_in, r_out, start, sweep):
+        """Triangle-strip vertices and outline points for one wedge"""
+        segs = max(2, int(math.ceil(sweep / self.SEGMENT_DEG)))
+        verts = []
+        outer = []
+        inner = []
+        for k in range(segs + 1):
+            t = math.radians(start + sweep * k / segs)
+            st, ct = math.sin(t), math.cos(t)
+            ox, oy = cx + r_out * st, cy + r_out * ct
+            ix, iy = cx + r_in * st, cy + r_in * ct
+            verts.extend((ox, oy, 0, 0, ix, iy, 0, 0))
+            outer.extend((ox, oy))
+            inner[:0] = (ix, iy)
+        return verts, list(range(2 * (segs + 1))), outer + inner
+
+    @instrumentation.timed("chart.donut_geometry")
+    def _update_geometry(self, *args):
+        """Reposition existing instructions for the current size and selection"""
+        n = len(self._categories)
+        if n == 0 or self._total <= 0:
+            for w in self._wedges:
+                w['mesh'].vertices = []
+                w['mesh'].indices = []
+                w['edge'].points = []
+            self._geom = None
+            return
+
+        half_w = self.width * 0.5
+        r_out = min(half_w, self.height) * 0.5 / (1 + self.EXPLODE_RATIO) * 0.95
+        r_in = r_out * self.HOLE_RATIO
+        cx = self.x + half_w * 0.5
+        cy = self.y + self.height * 0.5
+
+        for i, w in enumerate(self._wedges):
+            start = self._start_angles[i]
+            sweep = self._values[i] / self._total * 360.0
+            ox = oy = 0
+            if self._categories[i] == self.selected_category:
+                mid = math.radians(start + sweep / 2)
+                ox = math.sin(mid) * r_out * self.EXPLODE_RATIO
+                oy = math.cos(mid) * r_out * self.EXPLODE_RATIO
+            verts, indices, outline = self._ring(cx + ox, cy + oy, r_in, r_out, start, sweep)
+            w['mesh'].vertices = verts
+            w['mesh'].indices = indices
+            w['edge'].points = outline
+
+        # Legend rows, vertically centred in the right half
+        row_h = min(dp(26), self.height / n)
+        top = cy + n * row_h / 2
+        lx = self.x + self.width * self.LEGEND_X
+        marker = min(dp(10), row_h * 0.6)
+        for i, row in enumerate(self._rows):
+            self._update_row_text(i)
+            row_y = top - (i + 1) * row_h
+            row['marker'].pos = (lx, row_y + (row_h - marker) / 2)
+            row['marker'].size = (marker, marker)
+            tw, th = row['text'].size
+            row['text'].pos = (lx + marker + dp(8), row_y + (row_h - th) / 2)
+
+        self._geom = (cx, cy, r_in, r_out, lx, top, row_h)
+
+    def category_at(self, x, y):
+        """Return the category under (x, y) in the ring or legend, else None"""
+        if not self._geom:
+            return None
+        cx, cy, r_in, r_out, lx, top, row_h = self._geom
+        n = len(self._categories)
+
+        if x >= lx - dp(8):
+            idx = int((top - y) // row_h)
+            return self._categories[idx] if 0 <= idx < n and y <= top else None
+
+        # The exploded wedge sits off-centre, so test it against its own centre first
+        sel = self.selected_category
+        if sel in self._categories:
+            i = self._categories.index(sel)
+            sweep = self._values[i] / self._total * 360.0
+            mid = math.radians(self._start_angles[i] + sweep / 2)
+            ex = cx + math.sin(mid) * r_out * self.EXPLODE_RATIO
+            ey = cy + math.cos(mid) * r_out * self.EXPLODE_RATIO
+            if self._wedge_index_at(x - ex, y - ey, r_in, r_out) == i:
+                return sel
+
+        i = self._wedge_index_at(x - cx, y - cy, r_in, r_out)
+        return self._categories[i] if i is not None else None
+
+    def _wedge_index_at(self, dx, dy, r_in, r_out):
+        dist = math.hypot(dx, dy)
+        if dist < r_in or dist > r_out:
+            return None
+        angle = (90 - math.degrees(math.atan2(dy, dx))) % 360
+        i = bisect_right(self._start_angles, angle) - 1
+        return i if 0 <= i < len(self._categories) else None
+
+    def on_touch_down(self, touch):
+        """Dispatch the tapped category (or None for a miss inside the widget)"""
+        if not self.collide_point(*touch.pos):
+            return super().on_touch_down(touch)
+        if getattr(touch, 'button', None) in ('scrollup', 'scrolldown'):
+            return False
+        category = self.category_at(*touch.pos)
+        self.dispatch('on_category_selection', category)
+        return category is not None
+
+    def on_category_selection(self, category):
+        """Event placeholder"""
+        pass
+
@@ -9,67 +9,66 @@ class LoadingScreen(Screen):
     message = StringProperty("Loading...")
     progress = NumericProperty(0)
     
+    # Continue to the next screen even if the preload is still running after this long
+    TIMEOUT = 5.0
+    
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self._event, self.next_screen, self._spinner_event = None, None, None
+        self.next_screen = None
+        self._preloader = None
+        self._timeout_event = None
+        self._finish_event = None
     
-    def start_loading(self, next_screen, message="Loading...", duration=1.0):  # ← Changed from 2.0 to 1.0
+    def start_loading(self, next_screen, message="Loading...", preloader=None, timeout=TIMEOUT):
         """
-        Start loading animation
+        Show loading progress until the next screen can be shown
         
         Args:
             next_screen: Screen to navigate to after loading
             message: Loading message to display
-            duration: Total duration of loading animation (default: 1.0 seconds, was 2.0)
+            preloader: PreloadScheduler to follow; the bar tracks its essential
+                tasks, and navigation happens as soon as they are done.
+                Without one, the next screen is shown on the next frame.
+            timeout: Seconds after which to continue even if loading is not done
         """
+        self._stop()
         self.message = message
-        if hasattr(self.ids, "loading_bar"):
-            self.ids.loading_bar.value = 0
         self.next_screen = next_screen
-        self.progress = 0
+        self._set_progress(0)
         
-        # Calculate update interval for smooth animation
-        # 50 steps total, so interval = duration / 50
-        period = max(duration / 50.0, 0.02)  # Minimum 0.02 seconds between updates
+        if preloader is None or preloader.essential_done:
+            self._finish_event = Clock.schedule_once(self._finish, 0)
+            return
         
-        if self._event:
-            self._event.cancel()
-        self._event = Clock.schedule_interval(self.update_progress, period)
-        self._start_spinner_animation()
+        self._preloader = preloader
+        preloader.bind(essential_progress=self._on_preload_progress, on_essential_ready=self._finish)
+        self._timeout_event = Clock.schedule_once(self._on_timeout, timeout)
     
-    def _start_spinner_animation(self):
-        """Start spinner animation (optional visual effect)"""
-        try:
-            def animate_spinner(dt):
-                # You can add spinner rotation logic here if needed
-                pass
-            
-            if self._spinner_event:
-                self._spinner_event.cancel()
-            # Update spinner every 0.05 seconds (was 0.05, keep same for smoothness)
-            self._spinner_event = Clock.schedule_interval(animate_spinner, 0.05)
-        except Exception:
-            pass
+    def _set_progress(self, value):
+        self.progress = value
+        if hasattr(self.ids, "loading_bar"):
+            self.ids.loading_bar.value = min(value, 100)
     
-    def update_progress(self, dt):
-        """Update progress bar"""
-        if self.progress >= 100:
-            # Loading complete
-            if self._event:
-                self._event.cancel()
-                self._event = None
-            if self._spinner_event:
-                self._spinner_event.cancel()
-                self._spinner_event = None
-            
-            # Navigate to next screen
-            if self.manager and self.next_screen:
-                self.manager.current = self.next_screen
-            return False
-        else:
-            # Increment progress
-            self.progress += 2  # Increment by 2 each step (50 steps total)
-            if hasattr(self.ids, "loading_bar"):
-                self.ids.loading_bar.value = min(self.progress, 100)
-            return True
-
+    def _on_preload_progress(self, preloader, value):
+        self._set_progress(value * 100)
+    
+    def _on_timeout(self, dt):
+        print(f"✗ Loading still running after {self.TIMEOUT:.0f}s, continuing")
+        self._finish()
+    
+    def _stop(self):
+        """Stop following the preloader and cancel pending callbacks"""
+        if self._preloader:
+            self._preloader.unbind(essential_progress=self._on_preload_progress, on_essential_ready=self._finish)
+            self._preloader = None
+        for event in (self._timeout_event, self._finish_event):
+            if event:
+                event.cancel()
+        self._timeout_event = self._finish_event = None
+    
+    def _finish(self, *args):
+        """Loading complete: navigate to the next screen"""
+        self._stop()
+        self._set_progress(100)
+        if self.manager and self.next_screen:
+            self.manager.current = self.next_screen
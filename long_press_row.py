@@ -2,133 +2,136 @@
 # FILE 2: widgets/long_press_row.py
 # ============================================================
 
+from bisect import bisect_right
+
 from kivy.uix.boxlayout import BoxLayout
-from kivy.graphics import Color, RoundedRectangle
+from kivy.uix.gridlayout import GridLayout
+from kivy.graphics import Color, RoundedRectangle, InstructionGroup
+from kivy.properties import ObjectProperty
 from kivy.metrics import dp
 from kivy.clock import Clock
 from kivy.core.window import Window
 
 
 class LongPressRow(BoxLayout):
-    """Widget that detects long press gestures"""
-    
+    """List row carrying item_data; presses are detected by the enclosing LongPressList"""
+    item_data = ObjectProperty(None, allownone=True)
+
+
+class LongPressList(GridLayout):
+    """
+    Single-column list that detects long presses for all of its rows.
+
+    One touch handler, one timer and one highlight serve the whole list;
+    the pressed row is found by bisecting the row positions. Dispatches
+    'on_long_press' with the row's item_data.
+    """
+    LONG_PRESS_DELAY = 0.5
+    PRESS_COLOR = (1, 1, 1, 0.05)
+    TRIGGERED_COLOR = (0.4, 0.7, 1.0, 0.15)
+
     def __init__(self, **kwargs):
-        super().__init__(**kwargs)
         self.register_event_type('on_long_press')
-        self._touch_start_time = 0
-        self._long_press_triggered = False
-        self._scheduled_event = None
-        self._touch_start_pos = (0, 0)
-        self._is_touching = False
+        super().__init__(**kwargs)
+        self._row_ys = None          # bottom y of each child, ascending
+        self._pressed = None
         self._touch_uid = None
-        self._highlight_instruction = None
-        self._highlight_color = None
-    
+        self._touch_start_pos = (0, 0)
+        self._long_press_triggered = False
+        self._trigger_long_press = Clock.create_trigger(self._on_long_press_timeout, self.LONG_PRESS_DELAY)
+
+        self._highlight = InstructionGroup()
+        self._highlight_color = Color(*self.PRESS_COLOR)
+        self._highlight_rect = RoundedRectangle(radius=[dp(6)])
+        self._highlight.add(self._highlight_color)
+        self._highlight.add(self._highlight_rect)
+        self._highlight_shown = False
+
+    def do_layout(self, *args):
+        super().do_layout(*args)
+        self._row_ys = None
+        if self._pressed is not None and self._highlight_shown:
+            self._highlight_rect.pos = self._pressed.pos
+            self._highlight_rect.size = self._pressed.size
+
+    def row_at(self, x, y):
+        """Row under (x, y) in this widget's parent coordinates, or None"""
+        if not self.children or not self.collide_point(x, y):
+            return None
+        if self._row_ys is None:
+            # children[0] is the last row added, i.e. the bottom one
+            self._row_ys = [c.y for c in self.children]
+        i = bisect_right(self._row_ys, y) - 1
+        if i < 0:
+            return None
+        row = self.children[i]
+        if y > row.top or getattr(row, 'item_data', None) is None:
+            return None   # spacing, spacer or a non-item widget
+        return row
+
     def on_touch_down(self, touch):
-        if self.collide_point(*touch.pos):
-            self._touch_start_time = Clock.get_time()
-            self._touch_start_pos = touch.pos
-            self._long_press_triggered = False
-            self._is_touching = True
-            self._touch_uid = touch.uid
-            
-            self._show_press_feedback()
-            
-            if self._scheduled_event:
-                self._scheduled_event.cancel()
-            
-            self._scheduled_event = Clock.schedule_once(self._trigger_long_press, 0.5)
-            return True
-        
-        return super().on_touch_down(touch)
-    
+        row = self.row_at(*touch.pos)
+        if row is None:
+            return super().on_touch_down(touch)
+        self._cancel_long_press()
+        self._pressed = row
+        self._touch_uid = touch.uid
+        self._touch_start_pos = touch.pos
+        self._long_press_triggered = False
+        self._show_highlight(row)
+        self._trigger_long_press()
+        super().on_touch_down(touch)
+        return True
+
     def on_touch_move(self, touch):
-        if self._is_touching and touch.uid == self._touch_uid:
+        if touch.uid == self._touch_uid and not self._long_press_triggered:
             dx = touch.x - self._touch_start_pos[0]
             dy = touch.y - self._touch_start_pos[1]
-            distance = (dx ** 2 + dy ** 2) ** 0.5
-            
-            if distance > dp(20):
+            if dx * dx + dy * dy > dp(20) ** 2:
                 self._cancel_long_press()
-                self._is_touching = False
-            
-            return super().on_touch_move(touch)
-        
         return super().on_touch_move(touch)
-    
+
     def on_touch_up(self, touch):
-        if self._is_touching and touch.uid == self._touch_uid:
+        if touch.uid == self._touch_uid:
+            triggered = self._long_press_triggered
             self._cancel_long_press()
-            self._is_touching = False
-            self._touch_uid = None
-            
-            if self._long_press_triggered:
+            if triggered:
                 return True
-        
         return super().on_touch_up(touch)
-    
-    def _show_press_feedback(self):
-        """Show visual feedback"""
-        if self._highlight_instruction:
-            try:
-                self.canvas.after.remove(self._highlight_instruction)
-            except:
-                pass
-        
-        if self._highlight_color:
-            try:
-                self.canvas.after.remove(self._highlight_color)
-            except:
-                pass
-        
-        with self.canvas.after:
-            self._highlight_color = Color(1, 1, 1, 0.05)
-            self._highlight_instruction = RoundedRectangle(
-                pos=self.pos,
-                size=self.size,
-                radius=[dp(6)]
-            )
-        
-        self.bind(
-            pos=lambda i, v: setattr(self._highlight_instruction, 'pos', v) if self._highlight_instruction else None,
-            size=lambda i, v: setattr(self._highlight_instruction, 'size', v) if self._highlight_instruction else None
-        )
-    
+
+    def clear_widgets(self, *args, **kwargs):
+        self._cancel_long_press()
+        super().clear_widgets(*args, **kwargs)
+
+    def _show_highlight(self, row):
+        self._highlight_color.rgba = self.PRESS_COLOR
+        self._highlight_rect.pos = row.pos
+        self._highlight_rect.size = row.size
+        if not self._highlight_shown:
+            self.canvas.after.add(self._highlight)
+            self._highlight_shown = True
+
     def _cancel_long_press(self):
-        """Cancel long press"""
-        if self._scheduled_event:
-            self._scheduled_event.cancel()
-            self._scheduled_event = None
-        
-        if self._highlight_instruction:
-            try:
-                self.canvas.after.remove(self._highlight_instruction)
-            except:
-                pass
-            self._highlight_instruction = None
-        
-        if self._highlight_color:
-            try:
-                self.canvas.after.remove(self._highlight_color)
-            except:
-                pass
-            self._highlight_color = None
-    
-    def _trigger_long_press(self, dt):
-        """Trigger long press"""
-        if self._is_touching and not self._long_press_triggered:
-            self._long_press_triggered = True
-            
-            if self._highlight_color:
-                self._highlight_color.rgba = (0.4, 0.7, 1.0, 0.15)
-            
-            try:
-                Window.vibrate(0.05)
-            except:
-                pass
-            
-            self.dispatch('on_long_press')
-    
-    def on_long_press(self):
+        self._trigger_long_press.cancel()
+        self._pressed = None
+        self._touch_uid = None
+        self._long_press_triggered = False
+        if self._highlight_shown:
+            self.canvas.after.remove(self._highlight)
+            self._highlight_shown = False
+
+    def _on_long_press_timeout(self, dt):
+        row = self._pressed
+        if row is None or row.parent is not self:
+            return
+        self._long_press_triggered = True
+        self._highlight_color.rgba = self.TRIGGERED_COLOR
+        try:
+            Window.vibrate(0.05)
+        except Exception:
+            pass
+        self.dispatch('on_long_press', row.item_data)
+
+    def on_long_press(self, item_data):
         """Event placeholder"""
-        pass
\ No newline at end of file
+        pass
@@ -1,5 +1,9 @@
 # main.py
 
+# Imported first so startup timings are measured from the top of main.py
+import utils.startup_timing as startup_timing
+import utils.instrumentation as instrumentation
+
 from kivy.app import App
 from kivy.lang import Builder
 from kivy.clock import Clock
@@ -13,6 +17,8 @@ from kivy.properties import StringProperty
 from kivy.metrics import dp, sp
 from kivy.core.window import Window
 import os
+import threading
+from datetime import datetime
 
 from screens import(
     LoginScreen,
@@ -25,9 +31,12 @@ from screens import(
     )
 
 from widgets import NavButton
-from utils.gesture_handler import SwipeDetector
+from utils.gesture_handler import gestures
 from utils.auth_manager import AuthManager  
+from utils.preload_scheduler import PreloadScheduler
 import utils.database as db
+import utils.period_cache as period_cache
+from utils.data_repository import repository
 import utils.utils as utils
 
 # Constants
@@ -36,8 +45,68 @@ SIDEBAR_EXPANDED = dp(200)
 ANIMATION_SIDEBAR = 0.4
 
 
+_loaded_kv_files = set()
+
+
+def load_kv_once(path):
+    """Load a KV rules file the first time it is needed"""
+    if path not in _loaded_kv_files:
+        Builder.load_file(path)
+        _loaded_kv_files.add(path)
+
+
+class LazyScreenManager(ScreenManager):
+    """ScreenManager that builds registered screens, and loads their KV, on first use"""
+    # name -> (screen class, [kv files]); filled in once the screen classes exist
+    lazy_screens = {}
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        instrumentation.track_transitions(self)
+    
+    def get_screen(self, name):
+        if name in self.lazy_screens and not self.has_screen(name):
+            self.build_screen(name)
+        return super().get_screen(name)
+    
+    def built_screen(self, name):
+        """Return the screen if it has been built, else None (never builds it)"""
+        for screen in self.screens:
+            if screen.name == name:
+                return screen
+        return None
+    
+    def build_screen(self, name):
+        screen_cls, kv_files = self.lazy_screens[name]
+        with startup_timing.measure(f"screen:{name}"), instrumentation.span(f"screen.build:{name}"):
+            for path in kv_files:
+                load_kv_once(path)
+            screen = screen_cls(name=name)
+            self.add_widget(screen)
+        return screen
+    
+    def warm_up(self, names, on_done=None):
+        """Build the given screens in the background, one per frame"""
+        pending = list(names)
+        
+        def step(dt):
+            while pending and (pending[0] not in self.lazy_screens or self.has_screen(pending[0])):
+                pending.pop(0)
+            if pending:
+                self.build_screen(pending.pop(0))
+                Clock.schedule_once(step, 0)
+            elif on_done:
+                on_done()
+        
+        Clock.schedule_once(step, 0)
+
+
+class InnerScreenManager(LazyScreenManager):
+    """Screen manager for the pages inside MainAppScreen"""
+
+
 # ← ADD THIS CLASS BEFORE FJExpensesApp
-class ScreenManagement(ScreenManager):
+class ScreenManagement(LazyScreenManager):
     """Main screen manager"""
     admin_name = StringProperty("")
     
@@ -52,14 +121,22 @@ class MainAppScreen(Screen):
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.swipe_detector = None
+        self._swipe_handler = None
+    
+    def on_kv_post(self, base_widget):
+        # Sidebar starts collapsed
+        if hasattr(self.ids, 'main_sidebar'):
+            self.ids.main_sidebar.width = SIDEBAR_COLLAPSED
     
     def on_enter(self):
         """Initialize screen when entering"""
         self._init_inner_manager(0)
-        self._setup_swipe_detector()
+        self._register_swipes()
         if hasattr(self.ids, 'main_sidebar'):
-            App.get_running_app()._init_user_area(self.ids.main_sidebar.ids.get("user_area"))
+            app = App.get_running_app()
+            app._init_user_area(self.ids.main_sidebar.ids.get("user_area"))
+            # This screen is built lazily, so the sidebar is only reachable from here on
+            app._set_active_nav(self.ids.inner_content_manager.current)
     
     def _init_inner_manager(self, dt):
         """Initialize inner screen manager"""
@@ -68,41 +145,40 @@ class MainAppScreen(Screen):
             if self.ids.inner_content_manager.current not in self.screen_order:
                 self.ids.inner_content_manager.current = "home"
     
-    def _setup_swipe_detector(self):
-        """Setup swipe gesture detection"""
-        if self.swipe_detector:
+    def _register_swipes(self):
+        """Route swipes that start and end on this screen to the swipe handlers"""
+        if self._swipe_handler:
             return
-        self.swipe_detector = SwipeDetector()
-        self.swipe_detector.size = self.size
-        self.swipe_detector.pos = self.pos
-        self.swipe_detector.swipe_threshold = dp(80)
-        self.swipe_detector.bind(
-            on_swipe_left=self._on_swipe_left,
-            on_swipe_right=self._on_swipe_right,
-            on_swipe_up=self._on_swipe_up,
-            on_swipe_down=self._on_swipe_down
+        self._swipe_handler = gestures.register(
+            "swipe", self._on_swipe, region=self,
+            active=lambda: self.manager is not None and self.manager.current == self.name
         )
-        self.bind(
-            size=lambda *a: setattr(self.swipe_detector, 'size', self.size),
-            pos=lambda *a: setattr(self.swipe_detector, 'pos', self.pos)
-        )
-        self.add_widget(self.swipe_detector)
+    
+    def _on_swipe(self, gesture):
+        handler = {
+            "left": self._on_swipe_left,
+            "right": self._on_swipe_right,
+            "up": self._on_swipe_up,
+            "down": self._on_swipe_down
+        }[gesture.direction]
+        handler()
+        return True
     
     def _is_sidebar_expanded(self):
         """Check if sidebar is expanded"""
         return hasattr(self.ids, 'main_sidebar') and self.ids.main_sidebar.width > SIDEBAR_COLLAPSED + dp(10)
     
-    def _on_swipe_left(self, instance):
+    def _on_swipe_left(self):
         """Handle swipe left - close sidebar"""
         if self._is_sidebar_expanded():
             App.get_running_app().toggle_sidebar()
     
-    def _on_swipe_right(self, instance):
+    def _on_swipe_right(self):
         """Handle swipe right - open sidebar"""
         if not self._is_sidebar_expanded():
             App.get_running_app().toggle_sidebar()
     
-    def _on_swipe_up(self, instance):
+    def _on_swipe_up(self):
         """Handle swipe up - next screen"""
         if not self._is_sidebar_expanded():
             return
@@ -114,7 +190,7 @@ class MainAppScreen(Screen):
                 self.switch_to_screen(next_screen)
                 App.get_running_app()._set_active_nav(next_screen)
     
-    def _on_swipe_down(self, instance):
+    def _on_swipe_down(self):
         """Handle swipe down - previous screen"""
         if not self._is_sidebar_expanded():
             return
@@ -139,35 +215,79 @@ class MainAppScreen(Screen):
         cm.current = screen_name
 
 
+ScreenManagement.lazy_screens = {
+    "login": (LoginScreen, ["kv/login_screen.kv"]),
+    "register": (RegisterScreen, ["kv/register_screen.kv"]),
+    "main_app": (MainAppScreen, ["kv/home_screen.kv", "kv/main_app_screen.kv"]),
+}
+
+InnerScreenManager.lazy_screens = {
+    "add_expense": (AddExpenseScreen, ["kv/add_expense_screen.kv"]),
+    "activity_log": (ActivityLogScreen, ["kv/activity_log_screen.kv"]),
+    "charts": (ChartsScreen, ["kv/charts_screen.kv"]),
+}
+
+
 class FJExpensesApp(App):
     """Main application class"""
     logged_user = StringProperty("Guest")
     theme_mode = StringProperty('dark')
+    preloader = None
     
     def build(self):
         """Build the app"""
-        root = Builder.load_file("main.kv")
-        self.root = root
-        
-        # Set initial screen to loading
-        self.root.current = "loading"
+        with startup_timing.measure("build"):
+            # Only shared tokens/templates and the loading screen are parsed up front;
+            # the other screens load their KV when first built
+            Builder.load_file("main.kv")
+            load_kv_once("kv/loading_screen.kv")
+            root = ScreenManagement()
+            root.add_widget(LoadingScreen(name="loading"))
+            self.root = root
+            
+            # Set initial screen to loading
+            self.root.current = "loading"
         
-        # Collapse sidebar initially
-        try:
-            for sb in self._collect_sidebars():
-                sb.width = SIDEBAR_COLLAPSED
-        except Exception:
-            pass
+        Window.bind(on_flip=self._on_first_frame)
         
-        # Bind window touch events
-        Clock.schedule_once(lambda dt: Window.bind(on_touch_up=self._on_window_touch_up), 0)
-        Clock.schedule_once(lambda dt: self._set_active_nav("home"), 0.1)
+        # Taps outside the open sidebar / user menu close them
+        gestures.install()
+        gestures.register(("tap", "long_press"), self._on_outside_tap, active=self._overlay_open)
         
         # Check auto-login after a short delay
         Clock.schedule_once(self._check_auto_login, 0.2)
         
+        # Timeout 0 runs after the first frame, so schema work never delays it
+        Clock.schedule_once(self._start_background_warmup, 0)
+        
         return self.root
     
+    def _on_first_frame(self, *args):
+        """Build the remaining screens once the loading screen is on screen"""
+        Window.unbind(on_flip=self._on_first_frame)
+        startup_timing.mark("first_frame")
+        self.root.warm_up(["login", "main_app", "register"], on_done=self._warm_up_inner_screens)
+    
+    def _warm_up_inner_screens(self):
+        main_app = self.root.built_screen("main_app")
+        if main_app and hasattr(main_app.ids, 'inner_content_manager'):
+            main_app.ids.inner_content_manager.warm_up(
+                MainAppScreen.screen_order, on_done=self._on_warm_up_done
+            )
+        else:
+            self._on_warm_up_done()
+    
+    def _on_warm_up_done(self):
+        startup_timing.mark("warm_up_done")
+        if startup_timing.enabled():
+            startup_timing.dump()
+            if startup_timing.should_exit():
+                self.stop()
+    
+    def _start_background_warmup(self, dt):
+        """Create/migrate the database schema off the UI thread"""
+        threading.Thread(target=db.ensure_database, name="db-warmup", daemon=True).start()
+    
     def _check_auto_login(self, dt):
         """Check for existing session and decide where to go"""
         if AuthManager.is_session_valid():
@@ -176,93 +296,86 @@ class FJExpensesApp(App):
                 print(f"✓ Auto-login: Found valid session for {logged_user}")
                 self.logged_user = logged_user
                 
-                # Go to main app
+                # Go to main app once the essential data is loaded
                 self.root.get_screen("loading").start_loading(
                     next_screen="main_app",
                     message=f"Welcome back, {logged_user}!",
-                    duration=1.0
+                    preloader=self.start_preload(logged_user)
                 )
-                
-                # Preload screens
-                Clock.schedule_once(lambda dt: self._preload_all_screens(logged_user), 0.3)
                 return
         
         # No valid session, go to login
         print("No valid session found, showing login screen")
         self.root.get_screen("loading").start_loading(
             next_screen="login",
-            message="Welcome to FJ Expenses Tracker",
-            duration=0.8
+            message="Welcome to FJ Expenses Tracker"
         )
     
-    def _preload_all_screens(self, username):
-        """Preload all screens after auto-login"""
-        try:
+    def start_preload(self, username):
+        """Preload the user's data for every page, most important first"""
+        if self.preloader:
+            self.preloader.cancel()
+        repository.open(username)
+        cy, cm = datetime.now().year, datetime.now().month
+        
+        def inner_screen(name):
             main_app = self.root.get_screen("main_app")
-            if not main_app or not hasattr(main_app.ids, 'inner_content_manager'):
-                return
-            
-            cm = main_app.ids.inner_content_manager
-            
-            # Preload home
-            hs = cm.get_screen("home")
-            if hs:
-                if hasattr(hs, 'refresh_statistics'):
-                    hs.refresh_statistics()
-                if hasattr(hs, 'refresh_income_cards'):
-                    hs.refresh_income_cards()
-            
-            # Schedule other screens
-            Clock.schedule_once(lambda dt: self._preload_activity_log(cm), 0.5)
-            Clock.schedule_once(lambda dt: self._preload_charts(cm), 1.0)
-            Clock.schedule_once(lambda dt: self._preload_add_expense(cm), 1.5)
-        except Exception as e:
-            print(f"Error preloading: {e}")
-    
-    def _preload_activity_log(self, cm):
-        try:
-            acs = cm.get_screen("activity_log")
-            if acs and hasattr(acs, 'refresh_items'):
-                acs.refresh_items()
-                acs._items_loaded = True
-        except Exception as e:
-            print(f"Error: {e}")
-    
-    def _preload_charts(self, cm):
-        try:
-            cs = cm.get_screen("charts")
-            if cs:
-                from datetime import datetime
-                cy, mo = datetime.now().year, datetime.now().month
-                if hasattr(cs.ids, 'year_spinner'):
-                    yrs = utils.get_year_range(cy)
-                    cs.ids.year_spinner.values = yrs if yrs else [str(cy)]
-                    cs.ids.year_spinner.text = str(cy) if str(cy) in (yrs or []) else (yrs[0] if yrs else str(cy))
-                if hasattr(cs.ids, 'month_spinner'):
-                    mos = utils.get_month_list()
-                    cs.ids.month_spinner.values = mos if mos else ["January"]
-                    cs.ids.month_spinner.text = mos[min(max(0, mo - 1), len(mos) - 1)] if mos else "January"
-                cs._charts_generated = False
-        except Exception as e:
-            print(f"Error: {e}")
-    
-    def _preload_add_expense(self, cm):
-        try:
-            aes = cm.get_screen("add_expense")
-            if aes and hasattr(aes, 'ids'):
-                un = self.logged_user
-                if hasattr(aes.ids, 'category_spinner'):
-                    cats = db.get_categories(un)
-                    aes.ids.category_spinner.values = cats
-                    if cats:
-                        aes.ids.category_spinner.text = cats[0]
-                if hasattr(aes, 'refresh_income_spinner'):
-                    aes.refresh_income_spinner()
-                if hasattr(aes.ids, 'date_input'):
-                    aes.ids.date_input.text = utils.get_current_date()
-        except Exception as e:
-            print(f"Error: {e}")
- 
+            return main_app.ids.inner_content_manager.get_screen(name)
+        
+        def apply_home(_):
+            # HomeScreen reads its figures itself; the repository already holds them
+            hs = inner_screen("home")
+            if hasattr(hs, 'refresh_statistics'):
+                hs.refresh_statistics()
+            yield
+            if hasattr(hs, 'refresh_income_cards'):
+                hs.refresh_income_cards()
+        
+        def apply_activity_log(items):
+            acs = inner_screen("activity_log")
+            yield  # building the screen used up this frame's budget
+            yield from acs.set_items_in_steps(items)
+        
+        def apply_add_expense(data):
+            cats, incs = data
+            aes = inner_screen("add_expense")
+            yield
+            if hasattr(aes.ids, 'category_spinner'):
+                aes.ids.category_spinner.values = cats
+                if cats:
+                    aes.ids.category_spinner.text = cats[0]
+            aes.refresh_income_spinner(incs)
+            if hasattr(aes.ids, 'date_input'):
+                aes.ids.date_input.text = utils.get_current_date()
+        
+        def apply_charts(period):
+            cs = inner_screen("charts")
+            yield
+            cs.periods.put(username, "Daily", cy, cm, period)
+            if hasattr(cs.ids, 'year_spinner'):
+                yrs = utils.get_year_range(cy)
+                cs.ids.year_spinner.values = yrs if yrs else [str(cy)]
+                cs.ids.year_spinner.text = str(cy) if str(cy) in (yrs or []) else (yrs[0] if yrs else str(cy))
+            if hasattr(cs.ids, 'month_spinner'):
+                mos = utils.get_month_list()
+                cs.ids.month_spinner.values = mos if mos else ["January"]
+                cs.ids.month_spinner.text = mos[min(max(0, cm - 1), len(mos) - 1)] if mos else "January"
+            cs._charts_generated = False
+        
+        self.preloader = PreloadScheduler()
+        # The session's data is queried once; the page tasks below read it from memory
+        self.preloader.add("data", fetch=repository.load, priority=0, essential=True)
+        # Home is what the user sees first, so the loading screen waits for it
+        self.preloader.add("home", apply=apply_home, deps=["data"],
+                           priority=0, essential=True)
+        self.preloader.add("activity_log", fetch=lambda: ActivityLogScreen.load_items(username),
+                           apply=apply_activity_log, deps=["home", "data"], priority=1)
+        self.preloader.add("add_expense", fetch=lambda: (repository.categories(), repository.incomes()),
+                           apply=apply_add_expense, deps=["home", "data"], priority=2)
+        self.preloader.add("charts", fetch=lambda: period_cache.load_period(username, "Daily", cy, cm),
+                           apply=apply_charts, deps=["home", "data"], priority=3)
+        self.preloader.start()
+        return self.preloader
     
     def on_pause(self):
         """Update session activity when app is paused"""
@@ -277,6 +390,7 @@ class FJExpensesApp(App):
     
     def on_start(self):
         """Check for required icon files"""
+        instrumentation.install()
         required = [
             "icons/home.png",
             "icons/add_expense.png",
@@ -299,61 +413,39 @@ class FJExpensesApp(App):
     
     def on_stop(self):
         """Cleanup on app stop"""
-        try:
-            Window.unbind(on_touch_up=self._on_window_touch_up)
-        except Exception:
-            pass
-    
-    def _on_window_touch_up(self, window, touch):
-        """Handle window touch to close sidebar when clicking outside"""
-        if getattr(touch, "is_mouse_scrolling", False):
+        AuthManager.flush()
+        gestures.uninstall()
+        instrumentation.finish()
+    
+    def _overlay_open(self):
+        """Cheap check run for every tap: is the sidebar or the user menu open?"""
+        main_app = self.root.built_screen("main_app") if self.root else None
+        sb = main_app.ids.get("main_sidebar") if main_app else None
+        if sb is None:
             return False
-        
-        # Detect swipe vs click
-        if hasattr(touch, 'opos'):
-            dx = abs(touch.x - touch.opos[0])
-            dy = abs(touch.y - touch.opos[1])
-            total_distance = (dx ** 2 + dy ** 2) ** 0.5
+        if sb.width > SIDEBAR_COLLAPSED + dp(10):
+            return True
+        ua = sb.ids.get("user_area")
+        return bool(ua and getattr(ua, "menu_open", False))
+    
+    def _on_outside_tap(self, gesture):
+        """Close the sidebar or user menu when tapping outside it"""
+        pos = gesture.pos
+        for sb in self._collect_sidebars():
+            if sb.width > SIDEBAR_COLLAPSED + dp(10):
+                if not sb.collide_point(*sb.to_widget(*pos)):
+                    self.toggle_sidebar()
+                    return False
             
-            if total_distance > dp(50):
+            ua = sb.ids.get("user_area")
+            if not ua or not getattr(ua, "menu_open", False):
+                continue
+            if ua.collide_point(*ua.to_widget(*pos)):
+                return False
+            ub = ua.ids.get("user_btn")
+            if ub:
+                self.toggle_user_menu(ub)
                 return False
-        
-        try:
-            for sb in self._collect_sidebars():
-                try:
-                    current_width = getattr(sb, "width", SIDEBAR_COLLAPSED)
-                    threshold = SIDEBAR_COLLAPSED + dp(10)
-                    
-                    if current_width > threshold:
-                        sb_local_x, sb_local_y = sb.to_widget(*touch.pos)
-                        if not sb.collide_point(sb_local_x, sb_local_y):
-                            self.toggle_sidebar()
-                            return False
-                except Exception:
-                    pass
-                
-                ua = sb.ids.get("user_area") if sb and hasattr(sb, "ids") else None
-                if not ua or not getattr(ua, "menu_open", False):
-                    continue
-                
-                local_x, local_y = ua.to_widget(*touch.pos)
-                if ua.collide_point(local_x, local_y):
-                    return False
-                
-                sb_local_x, sb_local_y = sb.to_widget(*touch.pos)
-                if sb.collide_point(sb_local_x, sb_local_y):
-                    ub = ua.ids.get("user_btn")
-                    if ub:
-                        self.toggle_user_menu(ub)
-                        return False
-                
-                ub = ua.ids.get("user_btn")
-                if ub:
-                    self.toggle_user_menu(ub)
-                    return False
-        except Exception as e:
-            print("Error in global touch handler:", e)
-        
         return False
     
     def _init_user_area(self, ua):
@@ -396,7 +488,7 @@ class FJExpensesApp(App):
         sidebars = []
         try:
             if self.root:
-                main_app = self.root.get_screen("main_app")
+                main_app = self.root.built_screen("main_app")
                 if main_app and hasattr(main_app.ids, 'main_sidebar'):
                     sidebars.append(main_app.ids.main_sidebar)
         except Exception:
@@ -455,7 +547,7 @@ class FJExpensesApp(App):
     def refresh_all_screens(self):
         """Refresh all screens after data change"""
         try:
-            main_app = self.root.get_screen("main_app")
+            main_app = self.root.built_screen("main_app")
             if not main_app:
                 return
             
@@ -464,15 +556,7 @@ class FJExpensesApp(App):
             if home_screen and hasattr(home_screen, 'refresh_statistics'):
                 home_screen.refresh_statistics()
             
-            # Mark activity log to refresh
-            activity_screen = main_app.ids.inner_content_manager.get_screen("activity_log")
-            if activity_screen:
-                activity_screen._items_loaded = False
-            
-            # Mark charts to refresh
-            charts_screen = main_app.ids.inner_content_manager.get_screen("charts")
-            if charts_screen:
-                charts_screen._charts_generated = False
+            # Activity log and charts follow the data repository's change events
         except Exception as e:
             print(f"Error refreshing screens: {e}")
     
@@ -648,13 +732,7 @@ class FJExpensesApp(App):
                 return
             
             try:
-                with db.sqlite3.connect(db.DB_NAME) as conn:
-                    cursor = conn.cursor()
-                    cursor.execute(
-                        "UPDATE users SET password=? WHERE username=?",
-                        (np, self.logged_user)
-                    )
-                    conn.commit()
+                db.set_password(self.logged_user, np)
                 Popup(
                     title="Success",
                     content=Label(text="Password changed"),
@@ -717,6 +795,10 @@ class FJExpensesApp(App):
         """Logout user and clear session"""
         AuthManager.clear_session()  # ← CRITICAL LINE
         print("✓ User session cleared")
+        if self.preloader:
+            self.preloader.cancel()
+            self.preloader = None
+        repository.close()
         
         self.logged_user = "Guest"
         if self.root:
@@ -732,9 +814,9 @@ class FJExpensesApp(App):
     def toggle_theme_mode(self):
         """Toggle between dark and light theme"""
         self.theme_mode = 'light' if self.theme_mode == 'dark' else 'dark'
+        # Re-evaluate the theme tokens; main.kv no longer builds the root widget
         Builder.unload_file('main.kv')
-        self.root.clear_widgets()
-        self.root.add_widget(Builder.load_file('main.kv'))
+        Builder.load_file('main.kv')
 
 
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+# utils/period_cache.py
+"""
+Bounded cache of chart periods (expenses plus bar/category aggregates)
+A background worker fills in the periods the user is likely to open next
+"""
+
+import calendar
+import threading
+from collections import OrderedDict
+
+import utils.database as db
+import utils.chart_utils as chart_utils
+import utils.instrumentation as instrumentation
+from utils.data_repository import repository
+
+
+@instrumentation.timed("aggregate.load_period")
+def load_period(username, mode, year, month=None):
+    """Query and aggregate one chart period; returns a dict shared by the screen and the prefetcher"""
+    if repository.holds(username):
+        # Served from the session's in-memory collections
+        if mode == "Weekly":
+            exps = repository.expenses_between(*chart_utils.iso_year_bounds(year))
+        else:
+            exps = repository.expenses_in_period(year, month if mode == "Daily" else None)
+    elif mode == "Weekly":
+        # ISO weeks can start in late December and end in early January
+        exps = db.filter_expenses_between(username, *chart_utils.iso_year_bounds(year))
+    else:
+        exps = db.filter_expenses_by_period(username, year, month if mode == "Daily" else None)
+
+    if mode == "Monthly":
+        vals, _ = chart_utils.aggregate_by_month(exps, year)
+        lbls = [calendar.month_abbr[i+1] for i in range(12)]
+    elif mode == "Weekly":
+        vals, _ = chart_utils.aggregate_by_week(exps, year)
+        lbls = [f"W{i+1}" if i % 4 == 0 else "" for i in range(len(vals))]
+    else:  # Daily mode
+        vals, _ = chart_utils.aggregate_by_day(exps, year, month)
+        lbls = [str(i+1) if (i+1) % 2 == 1 else "" for i in range(len(vals))]
+
+    return {
+        "expenses": exps,
+        "labels": lbls,
+        "values": vals,
+        "categories": chart_utils.aggregate_by_category(exps)
+    }
+
+
+def adjacent_periods(mode, year, month=None):
+    """Periods worth prefetching from the current one, most likely first"""
+    if mode == "Daily":
+        prev_y, prev_m = (year, month - 1) if month > 1 else (year - 1, 12)
+        next_y, next_m = (year, month + 1) if month < 12 else (year + 1, 1)
+        return [("Daily", prev_y, prev_m), ("Daily", next_y, next_m), ("Monthly", year, None)]
+    return [(mode, year - 1, None), (mode, year + 1, None)]
+
+
+class PeriodCache:
+    """LRU of loaded periods, keyed by (username, mode, year, month)"""
+
+    def __init__(self, max_entries=24):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = []
+        self._wakeup = threading.Event()
+        self._generation = 0
+        self._worker = None
+
+    @staticmethod
+    def _key(username, mode, year, month):
+        return (username, mode, int(year), int(month or 0))
+
+    def get(self, username, mode, year, month=None):
+        """Cached period, loading it on this thread on a miss"""
+        key = self._key(username, mode, year, month)
+        with self._lock:
+            period = self._entries.get(key)
+            if period is not None:
+                self._entries.move_to_end(key)
+                return period
+        period = load_period(username, mode, year, month)
+        with self._lock:
+            self._insert(key, period)
+        return period
+
+    def put(self, username, mode, year, month, period):
+        """Store a period loaded elsewhere (e.g. by the startup preload)"""
+        with self._lock:
+            self._insert(self._key(username, mode, year, month), period)
+
+    def _insert(self, key, period):
+        # Caller holds self._lock
+        self._entries[key] = period
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def prefetch(self, username, periods):
+        """Load the given (mode, year, month) periods in the background, replacing earlier requests"""
+        with self._lock:
+            self._pending = [self._key(username, *p) for p in periods
+                             if self._key(username, *p) not in self._entries]
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="period-prefetch", daemon=True)
+            self._worker.start()
+        self._wakeup.set()
+
+    def invalidate(self, months):
+        """Drop the cached periods that contain any of the given (year, month) pairs"""
+        months = set(months)
+        years = {y for y, m in months}
+        # An ISO week-year also takes in late December / early January days
+        week_years = years | {y + 1 for y, m in months if m == 12} | {y - 1 for y, m in months if m == 1}
+        with self._lock:
+            for key in list(self._entries):
+                _, mode, year, month = key
+                if (mode == "Daily" and (year, month) in months
+                        or mode == "Monthly" and year in years
+                        or mode == "Weekly" and year in week_years):
+                    del self._entries[key]
+            self._pending = []
+            self._generation += 1
+
+    def clear(self):
+        """Drop every cached period (e.g. after expenses changed)"""
+        with self._lock:
+            self._entries.clear()
+            self._pending = []
+            self._generation += 1
+
+    def _run(self):
+        while True:
+            self._wakeup.wait()
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._wakeup.clear()
+                        break
+                    key = self._pending.pop(0)
+                    generation = self._generation
+                    if key in self._entries:
+                        continue
+                try:
+                    period = load_period(*key[:3], key[3] or None)
+                except Exception as e:
+                    print(f"✗ Prefetch failed for {key[1:]}: {e}")
+                    continue
+                with self._lock:
+                    # A clear() while loading means this result may be stale
+                    if generation == self._generation:
+                        self._insert(key, period)
@@ -0,0 +1,177 @@
+# utils/preload_scheduler.py
+"""
+Dependency-aware background preload
+Each task declares the tasks it depends on and a priority. Its fetch runs
+on a worker thread; its apply runs on the UI thread in slices that fit a
+per-frame time budget, so preloading never stalls a frame for long. The
+UI-thread pump only runs while there is something to apply: a finished fetch
+triggers it, and it re-triggers itself for the next frame while work remains.
+"""
+
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from types import GeneratorType
+
+from kivy.clock import Clock
+from kivy.event import EventDispatcher
+from kivy.properties import NumericProperty, BooleanProperty
+
+
+class PreloadScheduler(EventDispatcher):
+    """
+    Runs preload tasks as soon as their dependencies are done.
+
+    fetch() (optional) runs off the UI thread and must not touch widgets.
+    apply(data) (optional) runs on the UI thread; it may be a generator,
+    in which case each `yield` hands the rest of the frame back to Kivy.
+
+    Dispatches 'on_task_done' (name) after each task, 'on_essential_ready'
+    once every task added with essential=True has finished (what a loading
+    screen waits for) and 'on_complete' once every task has finished.
+    """
+    FRAME_BUDGET = 0.008   # seconds of apply work per frame
+
+    progress = NumericProperty(0)   # fraction of tasks done, 0..1
+    essential_progress = NumericProperty(0)   # fraction of essential tasks done, 0..1
+    essential_done = BooleanProperty(False)
+
+    def __init__(self, **kwargs):
+        self.register_event_type('on_task_done')
+        self.register_event_type('on_essential_ready')
+        self.register_event_type('on_complete')
+        super().__init__(**kwargs)
+        self._tasks = {}
+        self._started = set()
+        self._done = set()
+        self._results = deque()     # (name, data, error), appended by the worker
+        self._current = None        # (name, generator) being applied in slices
+        self._executor = None
+        self._running = False
+        # Clock triggers may be fired from the fetch worker thread
+        self._trigger_pump = Clock.create_trigger(self._pump, 0)
+
+    def add(self, name, fetch=None, apply=None, deps=(), priority=0, essential=False):
+        """Register a task; lower priority values run first among ready tasks"""
+        self._tasks[name] = {
+            'name': name,
+            'fetch': fetch,
+            'apply': apply,
+            'deps': tuple(deps),
+            'priority': priority,
+            'essential': essential
+        }
+        return self
+
+    def start(self):
+        self._check_essential()
+        if not self._tasks:
+            self.dispatch('on_complete')
+            return
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preload")
+        self._running = True
+        self._submit_ready()
+
+    def cancel(self):
+        """Stop applying results (e.g. on logout); in-flight fetches are discarded"""
+        self._running = False
+        self._trigger_pump.cancel()
+        if self._executor:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._results.clear()
+        self._current = None
+
+    @property
+    def finished(self):
+        return len(self._done) == len(self._tasks)
+
+    def is_done(self, name):
+        return name in self._done
+
+    def _submit_ready(self):
+        ready = [t for name, t in self._tasks.items()
+                 if name not in self._started and all(d in self._done for d in t['deps'])]
+        for task in sorted(ready, key=lambda t: t['priority']):
+            self._started.add(task['name'])
+            if task['fetch'] is None:
+                self._results.append((task['name'], None, None))
+                self._trigger_pump()
+            elif self._executor:
+                self._executor.submit(self._run_fetch, task)
+
+    def _run_fetch(self, task):
+        try:
+            self._results.append((task['name'], task['fetch'](), None))
+        except Exception as e:
+            self._results.append((task['name'], None, e))
+        self._trigger_pump()
+
+    def _pump(self, dt):
+        if not self._running:
+            return
+        deadline = time.perf_counter() + self.FRAME_BUDGET
+        while time.perf_counter() < deadline:
+            if self._current is None:
+                if not self._results:
+                    break
+                name, data, error = self._results.popleft()
+                if error is not None:
+                    print(f"✗ Preload '{name}' failed: {error}")
+                    self._finish(name)
+                    continue
+                apply = self._tasks[name]['apply']
+                try:
+                    step = apply(data) if apply else None
+                except Exception as e:
+                    print(f"✗ Preload '{name}' failed: {e}")
+                    self._finish(name)
+                    continue
+                if not isinstance(step, GeneratorType):
+                    self._finish(name)
+                    continue
+                self._current = (name, step)
+
+            name, step = self._current
+            try:
+                next(step)
+            except StopIteration:
+                self._current = None
+                self._finish(name)
+            except Exception as e:
+                print(f"✗ Preload '{name}' failed: {e}")
+                self._current = None
+                self._finish(name)
+
+        if self.finished:
+            self.cancel()
+            self.dispatch('on_complete')
+        elif self._current is not None or self._results:
+            self._trigger_pump()   # out of budget; continue next frame
+
+    def _finish(self, name):
+        self._done.add(name)
+        self.progress = len(self._done) / float(len(self._tasks))
+        if self._tasks[name]['essential']:
+            essential = [n for n, t in self._tasks.items() if t['essential']]
+            self.essential_progress = sum(n in self._done for n in essential) / float(len(essential))
+        self.dispatch('on_task_done', name)
+        self._check_essential()
+        self._submit_ready()
+
+    def _check_essential(self):
+        if self.essential_done:
+            return
+        if all(name in self._done for name, t in self._tasks.items() if t['essential']):
+            self.essential_progress = 1
+            self.essential_done = True
+            self.dispatch('on_essential_ready')
+
+    def on_task_done(self, name):
+        pass
+
+    def on_essential_ready(self):
+        pass
+
+    def on_complete(self):
+        pass
@@ -0,0 +1,117 @@
+# profile_startup.py
+"""
+Import-time profile of app startup
+Runs `python -X importtime` on the modules loaded before the login screen
+and reports the slowest imports, so startup regressions are easy to spot.
+With --app it launches the app itself and reports build, first-frame and
+per-screen build times recorded by utils/startup_timing.py.
+
+Usage (from the app root, next to main.py):
+    python profile_startup.py                 # profile "import main"
+    python profile_startup.py utils.chart_utils --top 15
+    python profile_startup.py --report startup_imports.txt
+    python profile_startup.py --app
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+# Modules whose presence at startup means something heavy was imported eagerly
+WATCHED = ("matplotlib", "numpy", "sqlite3", "kivy.core.window", "kivy.lang")
+
+
+def profile_import(module):
+    """Return [(cumulative_us, self_us, name)] for `import module` in a fresh interpreter"""
+    env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            self_us = int(parts[0])
+            cumulative_us = int(parts[1])
+        except ValueError:
+            continue  # header row
+        rows.append((cumulative_us, self_us, parts[2].rstrip()))
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+        rows.append((0, 0, f"  !! import failed: {tail[0]}"))
+    return rows
+
+
+def profile_app(timeout=60):
+    """Run main.py until its screen warm-up finishes; return the startup timing report"""
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    env = dict(os.environ, KIVY_NO_ARGS="1", KIVY_NO_CONSOLELOG="1",
+               FJ_STARTUP_TIMING=path, FJ_STARTUP_EXIT="1")
+    try:
+        subprocess.run([sys.executable, "main.py"], env=env, timeout=timeout,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(path) as f:
+            return json.load(f)
+    except (subprocess.TimeoutExpired, OSError, ValueError) as e:
+        print(f"✗ App startup profile failed: {e}")
+        return None
+    finally:
+        os.remove(path)
+
+
+def format_app_report(data):
+    lines = ["App startup timings"]
+    for name, ms in sorted(data["marks_ms"].items(), key=lambda kv: kv[1]):
+        lines.append(f"  {name:<24} at {ms:>8.1f} ms")
+    for name, ms in sorted(data["durations_ms"].items()):
+        lines.append(f"  {name:<24} took {ms:>6.1f} ms")
+    return "\n".join(lines)
+
+
+def format_report(module, rows, top):
+    names = {name.strip() for _, _, name in rows}
+    top_level = [r for r in rows if not r[2].startswith("  ")]
+    total_ms = sum(r[0] for r in top_level) / 1000.0
+
+    lines = [f"Import profile for `import {module}`", f"Total: {total_ms:.1f} ms", ""]
+    lines.append("Watched modules:")
+    for w in WATCHED:
+        lines.append(f"  {w:<20} {'loaded' if w in names else 'not loaded'}")
+    lines.append("")
+    lines.append(f"Top {top} by cumulative time:")
+    lines.append(f"  {'cumul ms':>9} {'self ms':>8}  module")
+    for cumulative_us, self_us, name in sorted(rows, reverse=True)[:top]:
+        lines.append(f"  {cumulative_us / 1000.0:>9.1f} {self_us / 1000.0:>8.1f}  {name.strip()}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("modules", nargs="*", default=["main"])
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--report", help="also write the report to this file")
+    parser.add_argument("--app", action="store_true",
+                        help="also launch the app and report build/first-frame/screen timings")
+    args = parser.parse_args()
+
+    reports = [format_report(m, profile_import(m), args.top) for m in args.modules]
+    if args.app:
+        data = profile_app()
+        if data:
+            reports.append(format_app_report(data))
+    text = "\n\n".join(reports)
+    print(text)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# utils/startup_timing.py
+"""
+Startup timing harness
+Records build time, first-frame time and per-screen build time so lazy
+loading gains can be measured. Set FJ_STARTUP_TIMING=<file.json> to have
+the app write the numbers once warm-up finishes (FJ_STARTUP_EXIT=1 also
+quits the app at that point, for scripted runs).
+"""
+
+import json
+import os
+import time
+from contextlib import contextmanager
+
+# Reference point: the first import of this module, at the top of main.py
+_T0 = time.perf_counter()
+
+_marks = {}
+_durations = {}
+
+
+def elapsed_ms():
+    return (time.perf_counter() - _T0) * 1000.0
+
+
+def mark(name):
+    """Record the time since startup for a one-off milestone (first mark wins)"""
+    _marks.setdefault(name, elapsed_ms())
+
+
+@contextmanager
+def measure(name):
+    """Record how long the wrapped block takes"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _durations[name] = _durations.get(name, 0.0) + (time.perf_counter() - start) * 1000.0
+
+
+def report():
+    return {
+        "marks_ms": {k: round(v, 2) for k, v in _marks.items()},
+        "durations_ms": {k: round(v, 2) for k, v in _durations.items()},
+    }
+
+
+def enabled():
+    return bool(os.environ.get("FJ_STARTUP_TIMING"))
+
+
+def should_exit():
+    return os.environ.get("FJ_STARTUP_EXIT") == "1"
+
+
+def dump(path=None):
+    """Write the report to FJ_STARTUP_TIMING (or path) and print a summary"""
+    path = path or os.environ.get("FJ_STARTUP_TIMING")
+    data = report()
+    for name, ms in sorted(data["marks_ms"].items(), key=lambda kv: kv[1]):
+        print(f"✓ startup {name:<24} at {ms:>8.1f} ms")
+    for name, ms in sorted(data["durations_ms"].items()):
+        print(f"✓ startup {name:<24} took {ms:>6.1f} ms")
+    if not path:
+        return data
+    try:
+        with open(path, "w") as f:
+            json.dump(data, f, indent=2)
+    except OSError as e:
+        print(f"✗ Could not write startup timing: {e}")
+    return data
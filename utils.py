@@ -1,4 +1,4 @@
-from datetime import datetime
+from datetime import datetime, date
 import calendar
 
 # Category color and icon mapping
@@ -88,6 +88,30 @@ def validate_email(email):
         return False
     return True
 
+# Interned date fields keyed by the raw date string; expenses share a small
+# set of distinct dates, so each one is parsed only once per session.
+_DATE_FIELDS_CACHE = {}
+_DATE_FIELDS_CACHE_MAX = 8192
+
+def parse_date_fields(date_str):
+    """Parse 'YYYY-MM-DD' into (ordinal, year, month, day), or None if invalid"""
+    try:
+        return _DATE_FIELDS_CACHE[date_str]
+    except (KeyError, TypeError):
+        pass
+    try:
+        d = date.fromisoformat(date_str[:10])
+        fields = (d.toordinal(), d.year, d.month, d.day)
+    except (TypeError, ValueError):
+        fields = None
+    if len(_DATE_FIELDS_CACHE) >= _DATE_FIELDS_CACHE_MAX:
+        _DATE_FIELDS_CACHE.clear()
+    try:
+        _DATE_FIELDS_CACHE[date_str] = fields
+    except TypeError:
+        pass
+    return fields
+
 def get_current_date():
     """Get current date as YYYY-MM-DD"""
     return datetime.now().strftime("%Y-%m-%d")